@@ -10,12 +10,8 @@ Leo：个人脚本统一入口
 用于将本地 Scripts 仓库硬重置到远程 origin/main（全部替换本地修改，慎用）。
 """
 
-import argparse
 import os
 import sys
-import subprocess
-import shutil
-from datetime import datetime
 
 
 # ======================================================================
@@ -24,6 +20,12 @@ from datetime import datetime
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# 本地缓存目录（git 时间戳等），删掉不影响使用
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "leo",
+)
+
 
 # ======================================================================
 # 1. 这里配置所有脚本（工具表 TOOLS）
@@ -31,242 +33,499 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # 结构：
 # TOOLS = {
 #   "组名(group)": {
-#       "命令名(command)": {
-#           "script": "相对 Scripts 的路径",
-#           "help": "子命令的一句话说明（在总览和 help 中显示）",
-#           "desc": "子命令的详细说明（子命令 -h 时显示）",
-#           "examples": [ "示例命令1", "示例命令2", ... ],
-#           "copy_files": [  # 可选：运行前要复制到当前目录的文件列表（相对 Scripts）
+#       "命令名(command)": Cmd(
+#           script="相对 Scripts 的路径",
+#           help="子命令的一句话说明（在总览和 help 中显示）",
+#           desc="子命令的详细说明（子命令 -h 时显示）",
+#           examples=[ "示例命令1", "示例命令2", ... ],
+#           copy_files=[  # 可选：运行前要复制到当前目录的文件列表（相对 Scripts）
 #               os.path.join("Univer", "template.vasp"),
 #               ...
 #           ],
-#       },
+#       ),
 #       ...
 #   },
 #   ...
 # }
 # ======================================================================
 
+class Cmd:
+    """
+    TOOLS 中的一条命令。字段固定，用 __slots__ 代替 dict：
+    占用更小，属性访问也不需要哈希查找。
+    """
+
+    __slots__ = ("script", "help", "desc", "examples", "copy_files")
+
+    def __init__(self, script, help="", desc="", examples=(), copy_files=()):
+        self.script = script
+        self.help = help
+        self.desc = desc
+        self.examples = examples
+        self.copy_files = copy_files
+
+
 TOOLS = {
     # ---------------- system 组：Leo 自身维护相关 ----------------
     "system": {
-        "update": {
-            "script": None,
-            "help": "Update",
-            "desc": (
+        "update": Cmd(
+            script=None,
+            help="Update",
+            desc=(
                 "将当前 Scripts 仓库硬重置到 origin/main：\n"
                 "  git fetch origin\n"
                 "  git reset --hard origin/main\n"
                 "\n"
                 "会丢弃本地未提交修改，请谨慎使用。"
             ),
-            "examples": [
+            examples=[
                 "leo system update",
             ],
-        },
+        ),
     },
 
     # ---------------- Univer 组：通用结构处理 ----------------
     "Univer": {
-        "substitute": {
-            "script": os.path.join("Univer", "Substitute-POSCAR.py"),
-            "help": "Substitute POSCAR elements",
-            "desc": "封装 Univer/Substitute-POSCAR.py，用于在 POSCAR 中随机替换元素。",
-            "examples": [
+        "substitute": Cmd(
+            script=os.path.join("Univer", "Substitute-POSCAR.py"),
+            help="Substitute POSCAR elements",
+            desc="封装 Univer/Substitute-POSCAR.py，用于在 POSCAR 中随机替换元素。",
+            examples=[
                 "leo Univer substitute POSCAR POSCAR_new Al Sc 0.25",
             ],
-        },
+        ),
 
-        "replicate": {
-            "script": os.path.join("Univer", "POSCAR2SUPER-X.py"),
-            "help": "Replicate POSCAR & convert format",
-            "desc": (
+        "replicate": Cmd(
+            script=os.path.join("Univer", "POSCAR2SUPER-X.py"),
+            help="Replicate POSCAR & convert format",
+            desc=(
                 "封装 Univer/POSCAR2SUPER-X.py，用于将 VASP 结构扩展为超胞，"
                 "并可输出多种格式（如 lammps-data）。"
             ),
-            "examples": [
+            examples=[
                 "leo Univer replicate POSCAR -r 2 2 2 -f lammps-data",
             ],
             # 一般不需要复制自身脚本，这里预留即可，未来可放模板文件
-            "copy_files": [
+            copy_files=[
                 os.path.join("Univer", "POSCAR2SUPER-X.py"),
             ],
-        },
+        ),
 
-        "vacancy": {
-            "script": os.path.join("Univer", "POS-Remove.py"),
-            "help": "Make vacancy in POSCAR",
-            "desc": "封装 Univer/POS-Remove.py，用于删掉 POSCAR 中指定元素/编号的原子。",
-            "examples": [
+        "vacancy": Cmd(
+            script=os.path.join("Univer", "POS-Remove.py"),
+            help="Make vacancy in POSCAR",
+            desc="封装 Univer/POS-Remove.py，用于删掉 POSCAR 中指定元素/编号的原子。",
+            examples=[
                 "leo Univer vacancy In 10 POSCAR",
             ],
-            "copy_files": [
+            copy_files=[
                 os.path.join("Univer", "POS-Remove.py"),
             ],
-        },
+        ),
 
-        "LMP2XYZ": {
-            "script": os.path.join("Univer", "LAMMPS2EXYZ.py"),
-            "help": "Convert LAMMPS dump to extxyz",
-            "desc": "封装 Univer/LAMMPS2EXYZ.py，将 LAMMPS dump 转换为 extxyz。",
-            "examples": [
+        "LMP2XYZ": Cmd(
+            script=os.path.join("Univer", "LAMMPS2EXYZ.py"),
+            help="Convert LAMMPS dump to extxyz",
+            desc="封装 Univer/LAMMPS2EXYZ.py，将 LAMMPS dump 转换为 extxyz。",
+            examples=[
                 "leo Univer LMP2XYZ dump.xyz --type-map 1:Al,2:N",
             ],
-        },
+        ),
 
-        "potcar": {
-            "script": os.path.join("Univer", "Make-POTCAR.py"),
-            "help": "Merge POTCAR by element order",
-            "desc": (
+        "potcar": Cmd(
+            script=os.path.join("Univer", "Make-POTCAR.py"),
+            help="Merge POTCAR by element order",
+            desc=(
                 "封装 Univer/Make-POTCAR.py，将 POTCAR 库中指定元素的 POTCAR 依次合并。\n"
                 "命令格式：元素1 元素2 ... POTCAR库目录（目录作为最后一个参数）。"
             ),
-            "examples": [
+            examples=[
                 "leo Univer potcar Ag H.25 /path/to/PBE",
             ],
-        },
+        ),
     },
 
     # ---------------- nep 组：NEP 势场相关工具 ----------------
     "nep": {
-        "plot": {
-            "script": os.path.join("NEP", "NEP-plot.py"),
-            "help": "Plot NEP training results",
-            "desc": "封装 NEP/NEP-plot.py，用于绘制 NEP 的训练损失、力误差等结果。",
-            "examples": [
+        "plot": Cmd(
+            script=os.path.join("NEP", "NEP-plot.py"),
+            help="Plot NEP training results",
+            desc="封装 NEP/NEP-plot.py，用于绘制 NEP 的训练损失、力误差等结果。",
+            examples=[
                 "leo nep plot",
             ],
-        },
-        "select": {
-            "script": os.path.join("NEP", "NEP-select.py"),
-            "help": "NEP select structure",
-            "desc": "封装 NEP/NEP-plot.py，用于绘制 NEP 的训练损失、力误差等结果。",
-            "examples": [
+        ),
+        "select": Cmd(
+            script=os.path.join("NEP", "NEP-select.py"),
+            help="NEP select structure",
+            desc="封装 NEP/NEP-plot.py，用于绘制 NEP 的训练损失、力误差等结果。",
+            examples=[
                 "leo nep select sample.xyz train.xyz nep.txt",
             ],
-        },
-        "single": {
-            "script": os.path.join("NEP", "Xyz2poscar.py"),
-            "help": "Generate VASP single-point",
-            "desc": (
+        ),
+        "single": Cmd(
+            script=os.path.join("NEP", "Xyz2poscar.py"),
+            help="Generate VASP single-point",
+            desc=(
                 "封装 NEP/Xyz2poscar.py，用于从 NEP 结构生成 VASP 单点能输入，"
                 "并可复制 INCAR/KPOINTS/run.sh 等辅助脚本。"
             ),
-            "examples": [
+            examples=[
                 "leo nep single dump.xyz --order Cu In P S",
             ],
-            "copy_files": [
+            copy_files=[
                 os.path.join("NEP", f)
                 for f in ["INCAR_Single_point", "KPOINTS", "run.sh", "Outcars2xyz.sh"]
             ],
-        },
+        ),
 
-        "split": {
-            "script": os.path.join("NEP", "Exyz-random-select.py"),
-            "help": "Split training/test exyz",
-            "desc": "封装 NEP/Exyz-random-select.py，按比例分开训练集和测试集。",
-            "examples": [
+        "split": Cmd(
+            script=os.path.join("NEP", "Exyz-random-select.py"),
+            help="Split training/test exyz",
+            desc="封装 NEP/Exyz-random-select.py，按比例分开训练集和测试集。",
+            examples=[
                 "leo nep split total.xyz 0.9",
             ],
-            "copy_files": [
+            copy_files=[
                 os.path.join("NEP", "Exyz-random-select.py"),
             ],
-        },
+        ),
     },
 
     # ---------------- MD 组：分子动力学后处理 ----------------
     "MD": {
-        "pdos": {
-            "script": os.path.join("MD", "PDOS.py"),
-            "help": "VACF + PDOS",
-            "desc": "封装 MD/PDOS.py，用于从 LAMMPS 速度 dump 计算 VACF 和 PDOS。",
-            "examples": [
+        "pdos": Cmd(
+            script=os.path.join("MD", "PDOS.py"),
+            help="VACF + PDOS",
+            desc="封装 MD/PDOS.py，用于从 LAMMPS 速度 dump 计算 VACF 和 PDOS。",
+            examples=[
                 "leo MD pdos dump.velo --ninitial 30 --corlength-steps 5000",
             ],
-        },
+        ),
 
-        "plt": {
-            "script": os.path.join("MD", "LAMMPS-Plot.py"),
-            "help": "Plot LAMMPS thermo",
-            "desc": (
+        "plt": Cmd(
+            script=os.path.join("MD", "LAMMPS-Plot.py"),
+            help="Plot LAMMPS thermo",
+            desc=(
                 "封装 MD/LAMMPS-Plot.py，用于绘制 LAMMPS log 中的温度、压强、"
                 "能量、晶格等随步长变化的曲线。"
             ),
-            "examples": [
+            examples=[
                 "leo MD plt log.lammps",
             ],
-        },
+        ),
 
-        "plt-gpu": {
-            "script": os.path.join("MD", "GPUMD-plot.py"),
-            "help": "Plot GPUMD thermo",
-            "desc": (
+        "plt-gpu": Cmd(
+            script=os.path.join("MD", "GPUMD-plot.py"),
+            help="Plot GPUMD thermo",
+            desc=(
                 "封装 MD/GPUMD-plot.py，用于绘制 GPUMD 的 thermo.out 中的 "
                 "温度、能量、应力、晶格等曲线。"
             ),
-            "examples": [
+            examples=[
                 "leo MD plt-gpu",
             ],
-        },
+        ),
 
-        "rdf": {
-            "script": os.path.join("MD", "RDF.py"),
-            "help": "Compute RDF g(r)",
-            "desc": "封装 MD/RDF.py，用于从 XDATCAR 或 LAMMPS dump 计算总 RDF 以及按类型分解的 RDF。",
-            "examples": [
+        "rdf": Cmd(
+            script=os.path.join("MD", "RDF.py"),
+            help="Compute RDF g(r)",
+            desc="封装 MD/RDF.py，用于从 XDATCAR 或 LAMMPS dump 计算总 RDF 以及按类型分解的 RDF。",
+            examples=[
                 "leo MD rdf dump.xyz --fmt lammps --type-map 1:Cu,2:Se",
             ],
-        },
+        ),
     },
 }
 
+# 由 TOOLS 预先展开的扁平查找表（模块加载时只算一次）：
+#   _ROUTE             : (group, command) -> info
+#   _GROUP_CMDS        : group -> [command, ...]（保持 TOOLS 中的顺序）
+#   _CMD_PREVIEWS      : (group, command) -> 总览中展示的示例命令
+#   _MAX_CMD_LEN       : 示例命令的最大长度（总览对齐用）
+_ROUTE = {
+    (group, cmd_name): info
+    for group, cmds in TOOLS.items()
+    for cmd_name, info in cmds.items()
+}
+_GROUP_CMDS = {group: list(cmds.keys()) for group, cmds in TOOLS.items()}
+_CMD_PREVIEWS = {
+    (group, cmd_name): (
+        info.examples[0] if info.examples else f"leo {group} {cmd_name}"
+    )
+    for (group, cmd_name), info in _ROUTE.items()
+}
+_MAX_CMD_LEN = max(len(s) for s in _CMD_PREVIEWS.values())
+
+# 脚本的绝对路径（按 TOOLS 中的相对路径索引）。
+# 设置环境变量 LEO_VERIFY_SCRIPTS=1 时，加载时顺便 stat 一遍，
+# 脚本缺失时 run_script 直接报错，不再复制文件、启动注定失败的解释器。
+_SCRIPT_PATHS = {
+    info.script: os.path.join(BASE_DIR, info.script)
+    for info in _ROUTE.values()
+    if info.script
+}
+_SCRIPT_EXISTS = (
+    {rel: os.path.isfile(path) for rel, path in _SCRIPT_PATHS.items()}
+    if os.environ.get("LEO_VERIFY_SCRIPTS") == "1"
+    else None
+)
+
 
 # ======================================================================
 # 2. 通用运行函数
 # ======================================================================
 
+def _existing_files(paths):
+    """
+    对 paths 涉及的每个目录只做一次 scandir，返回其中真实存在的文件路径集合
+    （代替逐个 os.path.exists）。
+    """
+    found = set()
+    for d in {os.path.dirname(p) for p in paths}:
+        try:
+            with os.scandir(d) as it:
+                found.update(entry.path for entry in it if entry.is_file())
+        except OSError:
+            pass
+    return found
+
+
+def _copy_file(src, dst):
+    """
+    复制单个文件并保留权限位（run.sh 等需要保持可执行）。
+    Linux 下用 os.sendfile 在内核中直接拷贝，其他平台退回 shutil.copy。
+    """
+    import shutil
+
+    if not sys.platform.startswith("linux"):
+        shutil.copy(src, dst)
+        return
+
+    # dst 与 src 是同一文件时（在脚本所在目录运行），先 open(dst, "wb") 会把源文件截断；
+    # 与 shutil.copy 一样抛 SameFileError，由调用方报告
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        raise shutil.SameFileError(f"{src!r} and {dst!r} are the same file")
+
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        st = os.fstat(fsrc.fileno())
+        offset = 0
+        while offset < st.st_size:
+            sent = os.sendfile(fdst.fileno(), fsrc.fileno(), offset, st.st_size - offset)
+            if sent == 0:
+                break
+            offset += sent
+    os.chmod(dst, st.st_mode & 0o777)
+
+
+# copy_files 数量达到这个值才用线程池并行复制
+_PARALLEL_COPY_MIN = 3
+
+
+def _copy_one(src, existing):
+    """
+    把单个依赖文件复制到当前目录，返回要打印的提示信息。
+    """
+    dst = os.path.join(os.getcwd(), os.path.basename(src))
+    if src not in existing:
+        return f"[Leo] ⚠ 需要复制的文件不存在: {src}"
+    try:
+        _copy_file(src, dst)
+        return f"[Leo] ✅ 已复制: {src}  →  {dst}"
+    except Exception as e:
+        return f"[Leo] ⚠ 复制文件时出错: {src} → {dst} | {e}"
+
+
 def run_script(script_rel_path, extra_args, copy_files=None):
     """
     调用某个子脚本：
       1) 如有需要，先把 copy_files 里的文件复制到当前目录
       2) 然后以当前 Python 解释器运行脚本
     """
-    # 1) 复制依赖文件
+    script_path = _SCRIPT_PATHS.get(script_rel_path) or os.path.join(BASE_DIR, script_rel_path)
+    if _SCRIPT_EXISTS is not None and not _SCRIPT_EXISTS.get(script_rel_path, True):
+        print(f"[Leo] ❌ 脚本不存在: {script_path}")
+        sys.exit(1)
+
+    # 1) 复制依赖文件（文件较多时用线程池并行复制，提示信息仍按原顺序打印）
     if copy_files:
-        for file_rel in copy_files:
-            src = os.path.join(BASE_DIR, file_rel)
-            dst = os.path.join(os.getcwd(), os.path.basename(file_rel))
-            try:
-                if not os.path.exists(src):
-                    print(f"[Leo] ⚠ 需要复制的文件不存在: {src}")
-                    continue
-                shutil.copy(src, dst)
-                print(f"[Leo] ✅ 已复制: {src}  →  {dst}")
-            except Exception as e:
-                print(f"[Leo] ⚠ 复制文件时出错: {src} → {dst} | {e}")
+        srcs = [os.path.join(BASE_DIR, file_rel) for file_rel in copy_files]
+        existing = _existing_files(srcs)
+        if len(srcs) >= _PARALLEL_COPY_MIN:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=min(8, len(srcs))) as ex:
+                messages = list(ex.map(lambda src: _copy_one(src, existing), srcs))
+        else:
+            messages = [_copy_one(src, existing) for src in srcs]
+        for msg in messages:
+            print(msg)
 
     # 2) 运行脚本
-    script_path = os.path.join(BASE_DIR, script_rel_path)
     cmd = [sys.executable, script_path] + extra_args
-    subprocess.run(cmd, check=True)
+
+    if os.name == "nt":
+        import subprocess
+        # Windows 下 execv 不会真正替换进程，父 shell 会提前拿回控制权
+        cp = subprocess.run(cmd)
+        sys.exit(cp.returncode)
+
+    # POSIX：子脚本直接替换当前 Leo 进程，省掉一个空等的 Python 进程
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.execv(sys.executable, cmd)
+
+
+def _read_cache(name, binary=False):
+    """
+    读取 CACHE_DIR 下的缓存文件（binary=True 时返回 bytes），
+    不存在或读失败时返回 None。
+    """
+    try:
+        if binary:
+            with open(os.path.join(CACHE_DIR, name), "rb") as f:
+                return f.read()
+        with open(os.path.join(CACHE_DIR, name), encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_cache(name, data):
+    """
+    原子地写入缓存文件（先写临时文件再 rename），失败时静默忽略。
+    data 可以是 str（按 UTF-8 写）或 bytes。
+    """
+    path = os.path.join(CACHE_DIR, name)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def _git_head_stamp():
+    """
+    用 .git/HEAD 以及它指向的 ref 文件的 mtime 作为“最后提交是否变化”的指纹
+    （只 stat，不启动 git）。提交/reset 只会改 ref 文件，不会改 HEAD 本身。
+    不是 git 仓库或读取失败时返回 None。
+    """
+    git_dir = os.path.join(BASE_DIR, ".git")
+    head = os.path.join(git_dir, "HEAD")
+    try:
+        parts = [BASE_DIR, str(os.stat(head).st_mtime_ns)]
+        with open(head, encoding="utf-8") as f:
+            ref = f.read().strip()
+        if ref.startswith("ref: "):
+            ref_path = os.path.join(git_dir, *ref[5:].split("/"))
+            if not os.path.isfile(ref_path):
+                ref_path = os.path.join(git_dir, "packed-refs")
+            parts.append(str(os.stat(ref_path).st_mtime_ns))
+    except OSError:
+        return None
+    return " ".join(parts)
+
+
+def _read_head_commit_time():
+    """
+    不启动 git，直接读 .git 目录得到 HEAD 提交的时间（YYYY-MM-DD HH:MM:SS，
+    与 `git log --date=iso` 一样使用提交者时区）：
+        .git/HEAD → refs/heads/<branch> 或 packed-refs → 松散 commit 对象（zlib）
+    对象已被打包（git gc 之后）等读不到的情况返回 None，由调用方退回 git 子进程。
+    """
+    import time
+    import zlib
+
+    git_dir = os.path.join(BASE_DIR, ".git")
+    try:
+        with open(os.path.join(git_dir, "HEAD"), encoding="utf-8") as f:
+            head = f.read().strip()
+
+        sha = head
+        if head.startswith("ref: "):
+            ref = head[5:]
+            try:
+                with open(os.path.join(git_dir, *ref.split("/")), encoding="utf-8") as f:
+                    sha = f.read().strip()
+            except FileNotFoundError:
+                sha = None
+                with open(os.path.join(git_dir, "packed-refs"), encoding="utf-8") as f:
+                    for line in f:
+                        parts = line.split()
+                        if len(parts) == 2 and parts[1] == ref:
+                            sha = parts[0]
+                            break
+        if not sha or len(sha) < 40:
+            return None
+
+        with open(os.path.join(git_dir, "objects", sha[:2], sha[2:]), "rb") as f:
+            raw = zlib.decompress(f.read())
+    except (OSError, zlib.error):
+        return None
+
+    header, _, body = raw.partition(b"\0")
+    if not header.startswith(b"commit "):
+        return None
+
+    for line in body.split(b"\n"):
+        if not line:
+            break  # 头部结束，后面是提交说明
+        if line.startswith(b"committer "):
+            # committer Name <email> 1735887441 +0800
+            try:
+                ts, tz = line.rsplit(b" ", 2)[1:]
+                offset = int(tz[1:3]) * 3600 + int(tz[3:5]) * 60
+                if tz[:1] == b"-":
+                    offset = -offset
+                return time.strftime(
+                    "%Y-%m-%d %H:%M:%S", time.gmtime(int(ts) + offset)
+                )
+            except (ValueError, IndexError):
+                return None
+    return None
 
 
 def get_git_last_update():
     """
     返回 git 仓库最后一次提交时间（YYYY-MM-DD HH:MM:SS）。
     若失败，则返回 'unknown'。
+
+    结果缓存在 CACHE_DIR/last_update（格式："指纹\t时间"），指纹未变时直接读缓存；
+    未命中时先尝试直接读 .git 对象，读不到才启动 git 子进程。
     """
-    try:
-        out = subprocess.check_output(
-            ["git", "-C", BASE_DIR, "log", "-1", "--format=%cd", "--date=iso"],
-            stderr=subprocess.DEVNULL,
-            text=True,
-        ).strip()
+    stamp = _git_head_stamp()
+    if stamp is not None:
+        cached = _read_cache("last_update")
+        if cached:
+            key, _, value = cached.partition("\t")
+            if key == stamp and value:
+                return value
+
+    last = _read_head_commit_time()
+    if last is None:
+        import subprocess
+        try:
+            out = subprocess.check_output(
+                ["git", "-C", BASE_DIR, "log", "-1", "--format=%cd", "--date=iso"],
+                stderr=subprocess.DEVNULL,
+                text=True,
+            ).strip()
+        except Exception:
+            return "unknown"
+
         # iso 示例："2025-01-03 14:57:21 +0800"
         # 只保留前 19 字符："2025-01-03 14:57:21"
-        return out[:19] if len(out) >= 19 else out
-    except Exception:
-        return "unknown"
+        last = out[:19] if len(out) >= 19 else out
+    if stamp is not None and last:
+        _write_cache("last_update", f"{stamp}\t{last}")
+    return last
 
 
 def run_update(branch="main"):
@@ -277,6 +536,8 @@ def run_update(branch="main"):
 
     相当于“全部替换”为远程 main 分支内容，会丢弃本地未提交修改。
     """
+    import subprocess
+
     repo_dir = BASE_DIR
     git_dir = os.path.join(repo_dir, ".git")
 
@@ -308,73 +569,210 @@ def build_overview():
     """
     猫猫头 + 居中组标题 + 两列对齐命令列表
     """
+    return _overview_bytes().decode("utf-8")
+
+
+def print_overview():
+    """
+    打印总览。stdout 是 UTF-8 的真实文件描述符时，
+    把（缓存好的）字节用 os.write 直接写出，不经过 print 的编码/换行处理。
+    """
+    data = _overview_bytes() + b"\n"
+
+    encoding = (getattr(sys.stdout, "encoding", None) or "").lower().replace("-", "")
+    try:
+        fd = sys.stdout.fileno()
+    except (AttributeError, OSError, ValueError):
+        fd = None
+    if fd is None or encoding != "utf8":
+        print(data[:-1].decode("utf-8"))
+        return
+
+    sys.stdout.flush()
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def _overview_bytes():
+    """
+    返回 UTF-8 编码的总览文本。
+
+    渲染结果缓存在 CACHE_DIR/overview.txt（首行为缓存键），
+    Leo.py 未修改、终端宽度与 git 时间都不变时直接复用。
+    """
 
     import shutil
     term_width = shutil.get_terminal_size((80, 20)).columns
     # 安全宽度
     term_width = max(term_width, 60)
 
-    lines = []
-
-    # ==== 猫猫头 ====
-    inner_width = 49 - 2
     last_git = get_git_last_update()
-    update_str = f"last git update: {last_git}"
-    if len(update_str) > inner_width:
-        update_str = update_str[:inner_width]
 
-    lines += [
+    try:
+        mtime = os.stat(os.path.abspath(__file__)).st_mtime_ns
+    except OSError:
+        return _render_overview(term_width, last_git).encode("utf-8")
+
+    key = f"{os.path.abspath(__file__)} {mtime} {term_width} {last_git}".encode("utf-8")
+    cached = _read_cache("overview.txt", binary=True)
+    if cached:
+        cached_key, _, data = cached.partition(b"\n")
+        if cached_key == key:
+            return data
+
+    data = _render_overview(term_width, last_git).encode("utf-8")
+    _write_cache("overview.txt", key + b"\n" + data)
+    return data
+
+
+def _build_banner_template():
+    """
+    预先拼好总览的 str.format 模板（模块加载时执行一次）：
+    只留两类占位符——{update_str}（git 时间行）和 {titles[i]}（随终端宽度居中的组标题），
+    命令行已按 _MAX_CMD_LEN 对齐好。
+    """
+    def esc(text):
+        return text.replace("{", "{{").replace("}", "}}")
+
+    # ==== 猫猫头 ====
+    lines = [
         "┌──────────────────────────────────────────────┐",
         "│   /\\_/\\                                       │",
         "│  ( o.o )   <  Miao!                           │",
-        "│" + update_str.ljust(inner_width) + "│",
+        "│{update_str}│",
         "│   > ^ <                                       │",
         "└──────────────────────────────────────────────┘",
         "【command】",
     ]
 
-    # ==== 收集所有命令用于对齐宽度 ====
-    all_cmds = []
-    for group, cmds in TOOLS.items():
-        for cmd_name, info in cmds.items():
-            example = info.get("examples", [])
-            cmd_str = example[0] if example else f"leo {group} {cmd_name}"
-            all_cmds.append(cmd_str)
-
-    max_cmd_width = max(len(s) for s in all_cmds)
-
     # ==== 按组打印 ====
-    for group_name, cmds in TOOLS.items():
-
-        # -------------------------
-        # ★ 居中标题：------- group -------
-        # -------------------------
-        title = f" {group_name} "
-        left = (term_width - len(title)) // 2
-        right = term_width - len(title) - left
-        lines.append("-" * left + title + "-" * right)
+    for i, (group_name, cmd_names) in enumerate(_GROUP_CMDS.items()):
+        lines.append(f"{{titles[{i}]}}")
 
         # ---- 组内命令 ----
-        for cmd_name, info in cmds.items():
-            help_txt = info.get("help", "")
-            example = info.get("examples", [])
-            cmd_str = example[0] if example else f"leo {group_name} {cmd_name}"
-
-            padded = cmd_str.ljust(max_cmd_width)
-            lines.append(f"  {padded}  |  {help_txt}")
+        for cmd_name in cmd_names:
+            route = (group_name, cmd_name)
+            help_txt = _ROUTE[route].help
+            padded = _CMD_PREVIEWS[route].ljust(_MAX_CMD_LEN)
+            lines.append(esc(f"  {padded}  |  {help_txt}"))
 
         lines.append("")  # 分组之间空行
 
     return "\n".join(lines)
 
+
+_BANNER_TEMPLATE = _build_banner_template()
+
+
+def _render_overview(term_width, last_git):
+    """
+    用 _BANNER_TEMPLATE 填入 git 时间和居中组标题（不读写缓存）。
+    """
+    inner_width = 49 - 2
+    update_str = f"last git update: {last_git}"[:inner_width].ljust(inner_width)
+
+    # ★ 居中标题：------- group -------
+    titles = []
+    for group_name in _GROUP_CMDS:
+        title = f" {group_name} "
+        left = (term_width - len(title)) // 2
+        right = term_width - len(title) - left
+        titles.append("-" * left + title + "-" * right)
+
+    return _BANNER_TEMPLATE.format(update_str=update_str, titles=titles)
+
 # ======================================================================
 # 4. 构建命令行解析（argparse）
 # ======================================================================
 
-def build_parser():
+def _sniff_group(argv):
+    """
+    从命令行参数中找出用户调用的组名（第一个非选项参数），
+    不属于 TOOLS 时返回 None。
+    """
+    for tok in argv:
+        if tok.startswith("-"):
+            continue
+        return tok if tok in TOOLS else None
+    return None
+
+
+def _dispatch(ns, extra_args, script_rel, copy_files):
+    """
+    argparse 子命令的执行函数：把透传参数交给 run_script。
+    """
+    run_script(script_rel, extra_args, copy_files)
+
+
+def _add_group_commands(group_parser, group_name, cmds):
+    """
+    为某个组创建其全部子命令（只在该组真正被调用时执行）。
+    """
+    import argparse
+    import functools
+
+    subparsers = group_parser.add_subparsers(
+        title=f"{group_name} 组可用命令",
+        dest="command",
+        metavar="command",
+    )
+
+    for cmd_name, info in cmds.items():
+        # system/update 做特殊处理：不调用 run_script，而是 run_update
+        if group_name == "system" and cmd_name == "update":
+            p = subparsers.add_parser(
+                cmd_name,
+                help=info.help,
+                description=info.desc,
+                add_help=True,
+                formatter_class=argparse.RawTextHelpFormatter,
+            )
+            p.set_defaults(func=lambda ns, extra_args: run_update())
+            continue
+
+        desc = info.desc or info.help
+        if info.examples:
+            desc += "\n\n示例：\n  " + "\n  ".join(info.examples)
+
+        # 不声明位置参数：main() 用 parse_known_args()，
+        # 未识别的参数即为要原样传给子脚本的参数
+        p = subparsers.add_parser(
+            cmd_name,
+            help=info.help,
+            description=desc,
+            epilog="后面所有参数会原样传递给对应脚本（保持与原脚本用法一致）。",
+            usage=f"leo {group_name} {cmd_name} [-h] ...",
+            add_help=True,
+            allow_abbrev=False,
+            formatter_class=argparse.RawTextHelpFormatter,
+        )
+
+        # 绑定执行函数（用 partial 固定参数，避免 lambda 晚绑定坑）
+        p.set_defaults(
+            pass_through=True,
+            func=functools.partial(
+                _dispatch,
+                script_rel=info.script,
+                copy_files=info.copy_files or None,
+            ),
+        )
+
+
+def build_parser(group=None):
     """
     构建 argparse 的 parser，但顶层展示用我们自己的 overview。
+
+    group 不为 None 时只展开该组的子命令，其余组只注册一个空壳
+    （保证组名仍可被识别/列出），避免每次调用都构建整棵命令树；
+    group 为 None 时构建完整的树。
     """
+    import argparse
+
+    # Leo 不做本地化：把 argparse 内部的 _()/ngettext() 换成恒等函数，
+    # 省掉每个 help 字符串、每次 add_parser 都要走一遍的 gettext 查找
+    argparse._ = lambda s: s
+    argparse.ngettext = lambda s, p, n: s if n == 1 else p
+
     parser = argparse.ArgumentParser(
         prog="leo",
         description="",
@@ -389,60 +787,70 @@ def build_parser():
         help="例如：leo Univer substitute ... 或 leo nep plot ...",
     )
 
-    # 按照 TOOLS 自动创建分组和子命令
     for group_name, cmds in TOOLS.items():
         group_parser = group_parsers.add_parser(
             group_name,
             help=f"{group_name} 相关工具集",
         )
-        subparsers = group_parser.add_subparsers(
-            title=f"{group_name} 组可用命令",
-            dest="command",
-            metavar="command",
-        )
+        if group is None or group_name == group:
+            _add_group_commands(group_parser, group_name, cmds)
 
-        for cmd_name, info in cmds.items():
-            # system/update 做特殊处理：不调用 run_script，而是 run_update
-            if group_name == "system" and cmd_name == "update":
-                p = subparsers.add_parser(
-                    cmd_name,
-                    help=info.get("help", ""),
-                    description=info.get("desc", ""),
-                    add_help=True,
-                    formatter_class=argparse.RawTextHelpFormatter,
-                )
-                p.set_defaults(func=lambda ns: run_update())
-                continue
+    return parser
 
-            desc = info.get("desc", info.get("help", ""))
-            examples = info.get("examples", [])
-            if examples:
-                desc += "\n\n示例：\n  " + "\n  ".join(examples)
 
-            p = subparsers.add_parser(
-                cmd_name,
-                help=info.get("help", ""),
-                description=desc,
-                add_help=True,
-                formatter_class=argparse.RawTextHelpFormatter,
-            )
-
-            # 所有后续参数原样传给子脚本
-            p.add_argument(
-                "args",
-                nargs=argparse.REMAINDER,
-                help="后面所有参数会原样传递给对应脚本（保持与原脚本用法一致）。",
-            )
+def _cached_help(argv):
+    """
+    处理 `leo <group> -h` 与 `leo <group> <command> ... -h`：
+    帮助文本缓存在 CACHE_DIR/help-<group>[-<command>].txt，
+    首行为缓存键（Leo.py 的路径 + mtime + 终端宽度），命中时完全不构建 argparse。
 
-            # 绑定执行函数（注意用默认参数避免 lambda 晚绑定坑）
-            script_rel = info["script"]
-            copy_files = info.get("copy_files", None)
-            p.set_defaults(
-                func=lambda ns, script_rel=script_rel, copy_files=copy_files:
-                    run_script(script_rel, ns.args, copy_files)
-            )
+    返回帮助文本；argv 不是上述形式时返回 None（交给 argparse 正常处理）。
+    """
+    help_flags = ("-h", "--help")
+    if not argv or argv[0] not in TOOLS:
+        return None
+
+    group, rest = argv[0], argv[1:]
+    if not rest:
+        return None
+    if rest[0] in help_flags:
+        cmd = None
+    else:
+        cmd = rest[0]
+        tail = rest[1:]
+        if "--" in tail:
+            tail = tail[:tail.index("--")]
+        if cmd not in TOOLS[group] or not any(tok in help_flags for tok in tail):
+            return None
 
-    return parser
+    import shutil
+    try:
+        mtime = os.stat(os.path.abspath(__file__)).st_mtime_ns
+    except OSError:
+        return None
+    key = f"{os.path.abspath(__file__)} {mtime} {shutil.get_terminal_size().columns}"
+    name = f"help-{group}-{cmd}.txt" if cmd else f"help-{group}.txt"
+
+    cached = _read_cache(name)
+    if cached:
+        cached_key, _, text = cached.partition("\n")
+        if cached_key == key:
+            return text
+
+    # 未命中：构建该组的 parser，截获 argparse 打印的帮助
+    import contextlib
+    import io
+
+    buf = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(buf):
+            build_parser(group).parse_args([group] + ([cmd] if cmd else []) + ["-h"])
+    except SystemExit:
+        pass
+    text = buf.getvalue()
+    if text:
+        _write_cache(name, key + "\n" + text)
+    return text or None
 
 
 # ======================================================================
@@ -450,17 +858,43 @@ def build_parser():
 # ======================================================================
 
 def main():
-    parser = build_parser()
+    # 直接 `leo` 或 `leo -h` 时，只打印猫猫头 + command 总览（不构建 argparse）
+    if len(sys.argv) == 1 or sys.argv[1:] in (["-h"], ["--help"]):
+        print_overview()
+        sys.exit(0)
 
-    # 直接 `leo` 时，只打印猫猫头 + command 总览
-    if len(sys.argv) == 1:
-        print(build_overview())
+    # `leo system update` 无参数，直接执行（`--help` 仍走 argparse）
+    if sys.argv[1:] == ["system", "update"]:
+        run_update()
+        return
+
+    # 快速通道：`leo <group> <command> ...` 且 command 后面紧跟的不是 -h/--help 时，
+    # 直接查 TOOLS 调用脚本，完全不构建 argparse（其余位置的 -h 原样透传给脚本）
+    if len(sys.argv) >= 3:
+        info = _ROUTE.get((sys.argv[1], sys.argv[2]))
+        extra_args = sys.argv[3:]
+        if (
+            info is not None
+            and info.script
+            and extra_args[:1] not in (["-h"], ["--help"])
+        ):
+            run_script(info.script, extra_args, info.copy_files or None)
+            return
+
+    help_text = _cached_help(sys.argv[1:])
+    if help_text is not None:
+        sys.stdout.write(help_text)
         sys.exit(0)
 
-    args = parser.parse_args()
+    parser = build_parser(_sniff_group(sys.argv[1:]))
+    args, extra_args = parser.parse_known_args()
+
+    # 只有脚本类命令接受透传参数，其余情况与 parse_args() 一样报错
+    if extra_args and not getattr(args, "pass_through", False):
+        parser.error("unrecognized arguments: " + " ".join(extra_args))
 
     if hasattr(args, "func"):
-        args.func(args)
+        args.func(args, extra_args)
     else:
         # 参数不完整或没匹配到命令时，也打印总览
         print(build_overview())
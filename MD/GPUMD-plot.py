@@ -18,6 +18,7 @@ quantity T  K  U  Pxx Pyy Pzz Pyz  Pxz  Pxy  ax ay az bx by bz cx cy cz
     python plot_thermo.py foo    # 也可以指定其它文件名 foo
 """
 
+import os
 import sys
 import numpy as np
 
@@ -26,12 +27,33 @@ matplotlib.use("Agg")  # 无图形界面后端
 import matplotlib.pyplot as plt
 
 
+# 文件小于这个大小时直接用 np.loadtxt（pandas 的固定开销反而更大）
+PANDAS_MIN_BYTES = 1 << 20
+
+# 行数超过 2 * DECIMATE_BINS 时画图前做 min/max 抽稀（图宽也就几千像素）
+DECIMATE_BINS = 4000
+
+
 def load_thermo_fixed(filename):
     """
     简单读取 thermo.out，为固定 18 列格式：
     T K U Pxx Pyy Pzz Pyz Pxz Pxy ax ay az bx by bz cx cy cz
+
+    大文件优先用 pandas 的 C 解析器（比 np.loadtxt 快很多）；
+    没装 pandas、文件较小或 pandas 解析失败时退回 np.loadtxt。
     """
-    data = np.loadtxt(filename, comments="#")
+    data = None
+    if os.path.getsize(filename) >= PANDAS_MIN_BYTES:
+        try:
+            import pandas as pd
+            df = pd.read_csv(filename, sep=r"\s+", comment="#", header=None,
+                             dtype=np.float64, engine="c", na_filter=False)
+            data = df.to_numpy(copy=False)
+        except (ImportError, ValueError):
+            data = None
+
+    if data is None:
+        data = np.loadtxt(filename, comments="#")
 
     # 确保二维
     if data.ndim == 1:
@@ -44,6 +66,24 @@ def load_thermo_fixed(filename):
     return data
 
 
+def decimate(x, y, n_bins=DECIMATE_BINS):
+    """
+    点数远多于像素时做 min/max 分箱抽稀：每箱在箱首 x 处保留最小、最大两个点，
+    峰谷包络不丢。y 可为一维或 (n, ncols)，所有列共用同一组箱。
+    点数不超过 2 * n_bins 时原样返回。
+    """
+    n = x.shape[0]
+    if n <= 2 * n_bins:
+        return x, y
+    step = -(-n // n_bins)
+    starts = np.arange(0, n, step)
+    # fmin/fmax 忽略 NaN，只有整箱都是 NaN 时才输出 NaN
+    y_out = np.empty((2 * len(starts),) + y.shape[1:], dtype=float)
+    y_out[0::2] = np.fmin.reduceat(y, starts, axis=0)
+    y_out[1::2] = np.fmax.reduceat(y, starts, axis=0)
+    return np.repeat(x[starts], 2), y_out
+
+
 def main():
     # --------- 处理命令行参数：无参数 -> thermo.out ---------- #
     if len(sys.argv) < 2:
@@ -65,27 +105,16 @@ def main():
     # x = np.arange(1, nrows + 1)
     # x_label = "index (1-based)"
 
+    # 超长轨迹先抽稀，画图耗时只随像素数而不随行数增长
+    x, data = decimate(x, data)
+
     # --------- 各列赋名（按你给的固定顺序） ---------- #
-    T   = data[:, 0]   # col 1
-    K   = data[:, 1]   # col 2
-    U   = data[:, 2]   # col 3
-
-    Pxx = data[:, 3]   # col 4
-    Pyy = data[:, 4]   # col 5
-    Pzz = data[:, 5]   # col 6
-    Pyz = data[:, 6]   # col 7
-    Pxz = data[:, 7]   # col 8
-    Pxy = data[:, 8]   # col 9
-
-    ax = data[:, 9]    # col 10
-    ay = data[:, 10]   # col 11
-    az = data[:, 11]   # col 12
-    bx = data[:, 12]   # col 13
-    by = data[:, 13]   # col 14
-    bz = data[:, 14]   # col 15
-    cx = data[:, 15]   # col 16
-    cy = data[:, 16]   # col 17
-    cz = data[:, 17]   # col 18
+    # 列视图，不复制数据；每组曲线一次 plot 画完
+    T       = data[:, 0]      # col 1
+    KU      = data[:, 1:3]    # col 2-3:  K, U
+    P_diag  = data[:, 3:6]    # col 4-6:  Pxx, Pyy, Pzz
+    # col 7-9: Pyz, Pxz, Pxy（剪切分量，默认不画）
+    lattice = data[:, 9:18]   # col 10-18: ax ay az bx by bz cx cy cz
 
     # --------- 画 4 个子图 ---------- #
     fig, axes = plt.subplots(2, 2, figsize=(12, 8))
@@ -98,37 +127,26 @@ def main():
     ax11.set_title("Temperature")
 
     # 子图2：K & U
-    ax12.plot(x, K, label="K", linewidth=1)
-    ax12.plot(x, U, label="U", linewidth=1)
+    ax12.plot(x, KU, label=["K", "U"], linewidth=1)
     ax12.set_xlabel(x_label)
     ax12.set_ylabel("Energy (eV)")
     ax12.set_title("Kinetic & Potential Energy")
     ax12.legend()
 
     # 子图3：Pxx, Pyy, Pzz
-    ax21.plot(x, Pxx, label="Pxx", linewidth=1)
-    ax21.plot(x, Pyy, label="Pyy", linewidth=1)
-    ax21.plot(x, Pzz, label="Pzz", linewidth=1)
+    ax21.plot(x, P_diag, label=["Pxx", "Pyy", "Pzz"], linewidth=1)
     ax21.set_xlabel(x_label)
     ax21.set_ylabel("P (thermo units)")
     ax21.set_title("Diagonal Pressure/Stress")
     ax21.legend()
 
-    # （如果想看剪切分量，可以解开下面几行）
-    # ax21.plot(x, Pyz, label="Pyz", linewidth=1, linestyle="--")
-    # ax21.plot(x, Pxz, label="Pxz", linewidth=1, linestyle="--")
-    # ax21.plot(x, Pxy, label="Pxy", linewidth=1, linestyle="--")
+    # （如果想看剪切分量，可以解开下面这行）
+    # ax21.plot(x, data[:, 6:9], label=["Pyz", "Pxz", "Pxy"], linewidth=1, linestyle="--")
 
     # 子图4：晶格矢量分量
-    ax22.plot(x, ax, label="ax", linewidth=1)
-    ax22.plot(x, ay, label="ay", linewidth=1)
-    ax22.plot(x, az, label="az", linewidth=1)
-    ax22.plot(x, bx, label="bx", linewidth=1)
-    ax22.plot(x, by, label="by", linewidth=1)
-    ax22.plot(x, bz, label="bz", linewidth=1)
-    ax22.plot(x, cx, label="cx", linewidth=1)
-    ax22.plot(x, cy, label="cy", linewidth=1)
-    ax22.plot(x, cz, label="cz", linewidth=1)
+    ax22.plot(x, lattice,
+              label=["ax", "ay", "az", "bx", "by", "bz", "cx", "cy", "cz"],
+              linewidth=1)
     ax22.set_xlabel(x_label)
     ax22.set_ylabel("Lattice component")
     ax22.set_title("Lattice Vectors (components)")
@@ -136,7 +154,7 @@ def main():
 
     fig.suptitle(f"{infile} summary", fontsize=14)
     fig.tight_layout(rect=[0, 0, 1, 0.96])
-    plt.savefig("thermo_plots.png", dpi=300)
+    plt.savefig("thermo_plots.png", dpi=300, pil_kwargs={"compress_level": 3})
     plt.close(fig)
 
     print("已保存图像：thermo_plots.png")
@@ -18,19 +18,33 @@ thermo_style custom step temp press pxx pyy pzz pe ke enthalpy etotal vol \
     python plt.py log.lammps --prefix myrun
 """
 
+import io
 import re
 import sys
+import functools
 import argparse
 import numpy as np
+
+import matplotlib
+matplotlib.use("Agg")  # 无图形界面后端
 import matplotlib.pyplot as plt
 
 # ------------------ 工具函数：判断一个字符串是不是数字 ------------------ #
 
 _num_pattern = re.compile(r'^[-+]?\d+(\.\d*)?([eEdD][-+]?\d+)?$')
+_num_first_chars = frozenset("+-0123456789")
 
 def is_number(s: str) -> bool:
     """判断字符串 s 是否是类似 1, -2.3, 4.5e-3, 1.0D+02 这样的数字。"""
-    return bool(_num_pattern.match(s))
+    # 首字符不可能开头数字的直接排除（log 里的文字行基本都在这里被挡掉）
+    if not s or s[0] not in _num_first_chars:
+        return False
+    try:
+        float(s)
+        return True
+    except ValueError:
+        # float() 不认 Fortran 风格的 D 指数，交给正则
+        return bool(_num_pattern.match(s))
 
 
 # ------------------ 解析 log.lammps 中的 thermo 块 ------------------ #
@@ -46,11 +60,31 @@ def parse_log_thermo_blocks(logfile):
 
     对不完整 block（列数不统一 / 最后一行没写完）会自动忽略，
     所以可以在 MD 还在运行时安全调用。
+
+    分两遍：先只定位每个 block 的行范围（不做浮点转换），
+    再把每个 block 的数据行一次性交给 pandas 的 C 解析器。
     """
     with open(logfile, "r") as f:
         lines = f.read().splitlines()
 
     runs = []
+    for header, start, end in scan_thermo_blocks(lines):
+        data = parse_thermo_rows(lines[start:end])
+        # 完全不完整的 block 丢弃
+        if data is not None and len(data) > 0:
+            runs.append((header, data))
+
+    return runs
+
+
+def scan_thermo_blocks(lines):
+    """
+    第一遍：找出每个 thermo block 的 (header, 数据起始行, 数据结束行)。
+
+    block 以 "Step ..." 开头；遇到空行、新的 Step / Loop time、
+    非数字开头的行或列数不对的行（通常是最后一行没写完）就结束。
+    """
+    blocks = []
     i = 0
     n = len(lines)
 
@@ -58,61 +92,90 @@ def parse_log_thermo_blocks(logfile):
         line = lines[i].strip()
 
         # thermo block 一般以 "Step ..." 开头
-        if line.startswith("Step"):
-            header = line.split()
-            ncols = len(header)
-            i += 1  # 移到数据行的第一行
-
-            data_rows = []
-
-            while i < n:
-                s = lines[i].strip()
-
-                # 空行：认为当前 thermo block 结束
-                if not s:
-                    i += 1
-                    break
-
-                parts = s.split()
-
-                # 碰到新的 Step / Loop time / 非数字开头的行：结束当前 block
-                if parts[0] in ("Step", "Loop"):
-                    break
-                if not is_number(parts[0]):
-                    break
-
-                # 列数不对：通常是最后一行没写完，结束当前 block（不再继续读）
-                if len(parts) != ncols:
-                    # print(f"[warning] skip incomplete thermo line: {s}")
-                    break
-
-                # 尝试转成 float
-                try:
-                    row = [float(x.replace('D', 'E').replace('d', 'e')) for x in parts]
-                except ValueError:
-                    # 有非数字内容，结束本 block
-                    break
-
-                data_rows.append(row)
-                i += 1
-
-            # 如果这一轮有有效数据，就存下来；完全不完整的 block 丢弃
-            if data_rows:
-                try:
-                    data = np.array(data_rows, dtype=float)
-                except ValueError:
-                    data = None
-
-                if data is not None:
-                    runs.append((header, data))
-        else:
+        if not line.startswith("Step"):
             i += 1
+            continue
 
-    return runs
+        header = line.split()
+        ncols = len(header)
+        i += 1  # 移到数据行的第一行
+        start = i
+
+        while i < n:
+            s = lines[i].strip()
+
+            # 空行：认为当前 thermo block 结束
+            if not s:
+                break
+
+            parts = s.split()
+
+            # 碰到新的 Step / Loop time / 非数字开头的行：结束当前 block
+            if parts[0] in ("Step", "Loop"):
+                break
+            if not is_number(parts[0]):
+                break
+
+            # 列数不对：通常是最后一行没写完，结束当前 block（不再继续读）
+            if len(parts) != ncols:
+                break
+
+            i += 1
+
+        if i > start:
+            blocks.append((header, start, i))
+
+    return blocks
+
+
+def parse_thermo_rows(rows):
+    """
+    第二遍：把一个 block 的数据行转成 float 数组。
+
+    Fortran 风格的 1.0D+02 只在整块文本里确实出现 D/d 时才整体替换一次
+    （LAMMPS 基本不会输出，正常情况下完全跳过）。
+
+    优先用 pandas.read_csv（C 引擎）一次解析整个 block；
+    没装 pandas 或解析失败时逐行转换，遇到无法转换的行就截断在这里。
+    """
+    text = "\n".join(rows)
+    if "D" in text or "d" in text:
+        text = text.replace("D", "E").replace("d", "e")
+
+    try:
+        import pandas as pd
+        df = pd.read_csv(io.StringIO(text), sep=r"\s+", header=None,
+                         dtype=np.float64, engine="c", na_filter=False)
+        return df.to_numpy()
+    except (ImportError, ValueError):
+        pass
+
+    data_rows = []
+    for s in text.split("\n"):
+        try:
+            data_rows.append(list(map(float, s.split())))
+        except ValueError:
+            # 有非数字内容，结束本 block
+            break
+
+    if not data_rows:
+        return None
+    return np.array(data_rows, dtype=float)
 
 
 # ------------------ 从 header 中找到某个物理量的列索引 ------------------ #
 
+@functools.lru_cache(maxsize=None)
+def _header_index_map(header):
+    """
+    小写列名 -> 列号（同名列取第一个）；多轮 run 的 header 通常相同，按 tuple 缓存。
+    """
+    header_map = {}
+    for i, h in enumerate(header):
+        header_map.setdefault(h.lower(), i)
+    return header_map
+
+
 def build_col_finder(header):
     """
     传入 Thermo header，例如:
@@ -123,7 +186,7 @@ def build_col_finder(header):
     返回一个函数 find_col(name_list)：
         给定一个“候选名字列表”，返回第一个匹配到的列号。
     """
-    header_lc = [h.lower() for h in header]
+    header_map = _header_index_map(tuple(header))
 
     def find_col(candidates, required=True):
         """
@@ -131,9 +194,9 @@ def build_col_finder(header):
         required  : 若 True，找不到则抛错；若 False，找不到返回 None
         """
         for cand in candidates:
-            cand_lc = cand.lower()
-            if cand_lc in header_lc:
-                return header_lc.index(cand_lc)
+            idx = header_map.get(cand.lower())
+            if idx is not None:
+                return idx
         if required:
             raise KeyError(f"None of {candidates} found in thermo header: {header}")
         else:
@@ -144,7 +207,38 @@ def build_col_finder(header):
 
 # ------------------ 为每一轮 run 画图 ------------------ #
 
-def plot_one_run(run_index, header, data, prefix="thermo"):
+DECIMATE_BINS = 4000  # 抽稀箱数，与 GPUMD-plot.py 相同
+
+
+def decimate(x, y, n_bins=DECIMATE_BINS):
+    """min/max 分箱抽稀（同 GPUMD-plot.py 中的 decimate）"""
+    n = x.shape[0]
+    if n <= 2 * n_bins:
+        return x, y
+    step = -(-n // n_bins)
+    starts = np.arange(0, n, step)
+    # fmin/fmax 忽略 NaN，只有整箱都是 NaN 时才输出 NaN
+    y_out = np.empty((2 * len(starts),) + y.shape[1:], dtype=float)
+    y_out[0::2] = np.fmin.reduceat(y, starts, axis=0)
+    y_out[1::2] = np.fmax.reduceat(y, starts, axis=0)
+    return np.repeat(x[starts], 2), y_out
+
+
+def make_run_figure():
+    """
+    创建 2x2 子图的大图及 1、4 号子图的右侧 y 轴。
+    多轮 run 复用同一个 figure，每轮只清空坐标轴重画。
+
+    返回 (fig, (ax1, ax2, ax3, ax4, ax1b, ax4b))
+    """
+    fig, axes = plt.subplots(2, 2, figsize=(11, 8), dpi=200)
+    ax1, ax2, ax3, ax4 = axes.flatten()
+    ax1b = ax1.twinx()
+    ax4b = ax4.twinx()
+    return fig, (ax1, ax2, ax3, ax4, ax1b, ax4b)
+
+
+def plot_one_run(run_index, header, data, prefix="thermo", fig_axes=None):
     """
     对单轮 run 的 thermo 数据画图并保存。
 
@@ -153,6 +247,7 @@ def plot_one_run(run_index, header, data, prefix="thermo"):
         header   : list[str]
         data     : np.ndarray (n_steps, n_cols)
         prefix   : 输出文件名前缀
+        fig_axes : make_run_figure() 的返回值；为 None 时本函数自建并关闭
     """
     if data.shape[0] < 2:
         print(f"[warning] run {run_index} has less than 2 rows, skip plotting.")
@@ -179,7 +274,8 @@ def plot_one_run(run_index, header, data, prefix="thermo"):
     idx_cb       = find_col(["cellbeta"])
     idx_cg       = find_col(["cellgamma"])
 
-    step = data[:, idx_step]
+    # 超长 run 先抽稀，画图耗时只随像素数而不随行数增长
+    step, data = decimate(data[:, idx_step], data)
 
     temp     = data[:, idx_temp]
     press    = data[:, idx_press]
@@ -199,8 +295,19 @@ def plot_one_run(run_index, header, data, prefix="thermo"):
     cg       = data[:, idx_cg]
 
     # ---- 画 2x2 子图 ---- #
-    fig, axes = plt.subplots(2, 2, figsize=(11, 8), dpi=200)
-    ax1, ax2, ax3, ax4 = axes.flatten()
+    own_fig = fig_axes is None
+    if own_fig:
+        fig_axes = make_run_figure()
+    fig, all_axes = fig_axes
+    for ax in all_axes:
+        ax.clear()
+    ax1, ax2, ax3, ax4, ax1b, ax4b = all_axes
+    for ax in (ax1b, ax4b):
+        # clear() 会把 twinx 的 y 轴恢复到左侧，这里挪回右侧
+        ax.yaxis.tick_right()
+        ax.yaxis.set_label_position("right")
+        ax.xaxis.set_visible(False)
+        ax.patch.set_visible(False)
 
     # 1) 温度 + 体积（双 y 轴）
     ax1.plot(step, temp, label="Temp (K)", color="C0")
@@ -208,7 +315,6 @@ def plot_one_run(run_index, header, data, prefix="thermo"):
     ax1.set_ylabel("Temp (K)", color="C0")
     ax1.tick_params(axis="y", labelcolor="C0")
 
-    ax1b = ax1.twinx()
     ax1b.plot(step, vol, label="Volume", color="C1")
     ax1b.set_ylabel("Volume", color="C1")
     ax1b.tick_params(axis="y", labelcolor="C1")
@@ -243,7 +349,6 @@ def plot_one_run(run_index, header, data, prefix="thermo"):
     ax4.set_ylabel("Lattice constants (Å)", color="C0")
     ax4.tick_params(axis="y", labelcolor="C0")
 
-    ax4b = ax4.twinx()
     ax4b.plot(step, ca, label="alpha", linestyle="--", color="C3")
     ax4b.plot(step, cb, label="beta",  linestyle="--", color="C4")
     ax4b.plot(step, cg, label="gamma", linestyle="--", color="C5")
@@ -261,8 +366,9 @@ def plot_one_run(run_index, header, data, prefix="thermo"):
     fig.tight_layout(rect=[0, 0, 1, 0.96])
 
     outname = f"{prefix}_run{run_index}.png"
-    plt.savefig(outname, dpi=300)
-    plt.close(fig)
+    fig.savefig(outname, dpi=300, pil_kwargs={"compress_level": 3})
+    if own_fig:
+        plt.close(fig)
     print(f"Saved figure for run {run_index}: {outname}")
 
 
@@ -284,9 +390,11 @@ def main():
 
     print(f"Detected {len(runs)} thermo run(s).")
 
+    fig_axes = make_run_figure()
     for i, (header, data) in enumerate(runs, start=1):
         print(f"Processing run {i} with {data.shape[0]} thermo lines ...")
-        plot_one_run(i, header, data, prefix=args.prefix)
+        plot_one_run(i, header, data, prefix=args.prefix, fig_axes=fig_axes)
+    plt.close(fig_axes[0])
 
 
 if __name__ == "__main__":
@@ -10,14 +10,39 @@
         --tfreq 10 --dt 0.001 --omaga-max 25 --max-omega-points 1500
 """
 
+import io
+import os
 import sys
+import mmap
 import time
 import math
+import warnings
 import argparse
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import numpy as np
+
+import matplotlib
+matplotlib.use("Agg")  # 无图形界面后端
 import matplotlib.pyplot as plt
 
+# numba 可选：装了就用 JIT 内核算 DOS，没装退回 NumPy 分块矩阵乘；
+# 设 PDOS_NO_JIT=1 可强制不用 JIT
+try:
+    import numba
+    from numba import prange
+except ImportError:
+    numba = None
+    prange = range
+
+USE_JIT = numba is not None and os.environ.get("PDOS_NO_JIT", "") in ("", "0")
+
+# pandas 可选：装了就用它的 C 解析器读 dump 的 ATOMS 块
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
 # ------- 默认参数（可通过命令行覆盖） ------- #
 DEFAULT_NINITIAL         = 20       # 多时间起点数目 Ninitial
 DEFAULT_CORLENGTH_STEPS  = 1000     # 相关长度（MD 原始步数）Corlength
@@ -27,6 +52,9 @@ DEFAULT_DT               = 0.001    # MD 时间步长 (ps)
 DEFAULT_OMAGA_MAX        = 20.0     # 最大频率 (THz)
 DEFAULT_MAX_OMEGA_POINTS = 1000     # 频率点数
 
+DOS_BLOCK = 512                     # 无 numba 时 DOS 余弦矩阵每块的频点数
+JIT_MIN_WORK = 100_000              # maxT * r_Corlength 小于此值时 JIT 开销不划算
+
 
 def progress_bar(current, total, start_time, prefix=""):
     """
@@ -54,50 +82,139 @@ def progress_bar(current, total, start_time, prefix=""):
 # 1. 读取 LAMMPS dump（速度）
 # ============================================================
 
+def parse_atoms_block(buf, natoms, id_col, type_col, v_cols):
+    """
+    解析一帧 ATOMS 块（natoms 行的 bytes），返回 ids, types, vels(natoms, 3)。
+    速度按 float32 存储，整条轨迹的内存和带宽减半。
+
+    装了 pandas 时整块交给 read_csv 的 C 引擎，只读需要的 5 列；
+    否则用 np.fromstring 一次性把整块转成数值矩阵再切列；
+    块中有非数值列（如 element）时才退回逐行 split 转换。
+    """
+    buf = buf.rstrip()
+    n_lines = buf.count(b"\n") + 1 if buf else 0
+    if n_lines < natoms:
+        raise RuntimeError("Incomplete ATOMS block at end of dump file")
+    if n_lines > natoms:
+        raise RuntimeError(f"ATOMS block has {n_lines} lines, expected {natoms}")
+
+    if pd is not None:
+        usecols = [id_col, type_col, *v_cols]
+        dtype = {c: np.float32 for c in v_cols}
+        dtype[id_col] = np.int64
+        dtype[type_col] = np.int64
+        df = pd.read_csv(io.BytesIO(buf), sep=r"\s+", header=None,
+                         usecols=usecols, dtype=dtype, engine="c", na_filter=False)
+        return (df[id_col].to_numpy(),
+                df[type_col].to_numpy(),
+                df[list(v_cols)].to_numpy())
+
+    text = buf.decode()
+    ncols = len(text.split("\n", 1)[0].split())
+    with warnings.catch_warnings():
+        # 遇到非数值 token 时，旧版 numpy 只给 DeprecationWarning 并提前截断，
+        # 新版直接抛 ValueError；两种情况都按元素个数不符处理
+        warnings.simplefilter("ignore", DeprecationWarning)
+        try:
+            arr = np.fromstring(text, sep=" ")
+        except ValueError:
+            arr = np.empty(0)
+    if ncols and arr.size == natoms * ncols:
+        arr = arr.reshape(natoms, ncols)
+        return (arr[:, id_col].astype(np.int64),
+                arr[:, type_col].astype(np.int64),
+                arr[:, list(v_cols)].astype(np.float32))
+
+    ids   = np.zeros(natoms, dtype=int)
+    types = np.zeros(natoms, dtype=int)
+    vels  = np.zeros((natoms, 3), dtype=np.float32)
+    vx_col, vy_col, vz_col = v_cols
+    for i, line in enumerate(text.splitlines()):
+        parts = line.split()
+        ids[i]        = int(parts[id_col])
+        types[i]      = int(parts[type_col])
+        vels[i, 0]    = float(parts[vx_col])
+        vels[i, 1]    = float(parts[vy_col])
+        vels[i, 2]    = float(parts[vz_col])
+    return ids, types, vels
+
+
+def find_frame_offsets(mm):
+    """
+    在 mmap 上用 find 找出所有 "ITEM: TIMESTEP" 行的起始偏移。
+    """
+    key = b"ITEM: TIMESTEP"
+    offsets = []
+    p = 0
+    while True:
+        p = mm.find(key, p)
+        if p == -1:
+            break
+        if p == 0 or mm[p - 1] == 0x0A:   # 只认行首
+            offsets.append(p)
+        p += len(key)
+    return offsets
+
+
+def read_frame_header(mm, start, end, n_lines=9):
+    """
+    从帧起始偏移读出 9 行帧头（TIMESTEP ~ ITEM: ATOMS），
+    返回 (行列表, ATOMS 数据起始偏移)；帧头不完整返回 (None, end)。
+    """
+    lines = []
+    pos = start
+    for _ in range(n_lines):
+        nl = mm.find(b"\n", pos, end)
+        if nl == -1:
+            return None, end
+        lines.append(mm[pos:nl].decode())
+        pos = nl + 1
+    return lines, pos
+
+
 def read_lammps_dump_velocities(filename):
     """
     读取 LAMMPS dump 文件中所有帧的 (id, type, vx, vy, vz)。
 
+    文件整体 mmap，先二进制扫描出每帧的偏移，再逐帧把 ATOMS 块切片解析。
+
     要求：
       ITEM: ATOMS ... id ... type ... vx vy vz
     返回：
-      velocities: shape (n_frames, n_atoms, 3)
+      velocities: shape (n_frames, n_atoms, 3)，float32
       types     : shape (n_atoms,)  （按 id 排序后的 type）
       ids       : shape (n_atoms,)
     """
     print(f"Reading LAMMPS dump from: {filename}")
-    frames_vel = []
+    velocities = None   # 读到第一帧知道 natoms 后一次性分配
+    n_frames = 0
     ids_ref = None
     types_ref = None
 
-    with open(filename, "r") as f:
-        while True:
-            line = f.readline()
-            if not line:
-                break
-            if not line.startswith("ITEM: TIMESTEP"):
-                continue
+    with open(filename, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise RuntimeError("No frames found in dump file")
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
 
-            # TIMESTEP
-            step_line = f.readline()
-            if not step_line:
-                break
+    with mm:
+        offsets = find_frame_offsets(mm)
+        bounds = offsets[1:] + [len(mm)]
+        for start, end in zip(offsets, bounds):
+            header, atoms_start = read_frame_header(mm, start, end)
+            if header is None:
+                break   # 文件末尾被截断的帧头
 
             # NUMBER OF ATOMS
-            line = f.readline()
-            if not line.startswith("ITEM: NUMBER OF ATOMS"):
+            if not header[2].startswith("ITEM: NUMBER OF ATOMS"):
                 raise RuntimeError("Expected 'ITEM: NUMBER OF ATOMS'")
-            natoms = int(f.readline().strip())
+            natoms = int(header[3].strip())
 
-            # BOX BOUNDS
-            line = f.readline()
-            if not line.startswith("ITEM: BOX BOUNDS"):
+            # BOX BOUNDS（其后 3 行 box 跳过）
+            if not header[4].startswith("ITEM: BOX BOUNDS"):
                 raise RuntimeError("Expected 'ITEM: BOX BOUNDS'")
-            for _ in range(3):
-                f.readline()  # 跳过 3 行 box
 
             # ATOMS header
-            line = f.readline()
+            line = header[8]
             if not line.startswith("ITEM: ATOMS"):
                 raise RuntimeError("Expected 'ITEM: ATOMS'")
             header_parts = line.strip().split()[2:]  # 去掉 "ITEM:" "ATOMS"
@@ -113,36 +230,39 @@ def read_lammps_dump_velocities(filename):
             vy_col   = find_col("vy")
             vz_col   = find_col("vz")
 
-            ids   = np.zeros(natoms, dtype=int)
-            types = np.zeros(natoms, dtype=int)
-            vels  = np.zeros((natoms, 3), dtype=float)
-
-            # 读原子数据
-            for i in range(natoms):
-                parts = f.readline().split()
-                ids[i]        = int(parts[id_col])
-                types[i]      = int(parts[type_col])
-                vels[i, 0]    = float(parts[vx_col])
-                vels[i, 1]    = float(parts[vy_col])
-                vels[i, 2]    = float(parts[vz_col])
-
-            # 以 id 排序，保证每帧原子顺序一致
-            sort_idx     = np.argsort(ids)
-            ids_sorted   = ids[sort_idx]
-            types_sorted = types[sort_idx]
-            vels_sorted  = vels[sort_idx, :]
+            # 读原子数据：本帧 ATOMS 块切片作为一块整体解析
+            ids, types, vels = parse_atoms_block(
+                mm[atoms_start:end], natoms, id_col, type_col,
+                (vx_col, vy_col, vz_col)
+            )
+
+            # 以 id 排序，保证每帧原子顺序一致；
+            # dump_modify sort id 输出的帧本身有序，O(N) 检查后跳过 argsort 和重排
+            if np.all(ids[1:] > ids[:-1]):
+                ids_sorted, types_sorted, vels_sorted = ids, types, vels
+            else:
+                sort_idx     = np.argsort(ids)
+                ids_sorted   = ids[sort_idx]
+                types_sorted = types[sort_idx]
+                vels_sorted  = vels[sort_idx, :]
 
             if ids_ref is None:
-                ids_ref   = ids_sorted.copy()
-                types_ref = types_sorted.copy()
+                # ids/types 是本帧局部数组，直接留作参考，无需 copy
+                ids_ref   = ids_sorted
+                types_ref = types_sorted
+                velocities = np.empty((len(offsets), natoms, 3), dtype=np.float32)
             else:
                 if not np.array_equal(ids_sorted, ids_ref):
                     raise RuntimeError("Atom IDs differ between frames; "
                                        "cannot align velocities.")
 
-            frames_vel.append(vels_sorted)
+            # 直接写入预分配缓冲区，省掉最后 np.stack 的整条轨迹拷贝
+            velocities[n_frames] = vels_sorted
+            n_frames += 1
 
-    velocities = np.stack(frames_vel, axis=0)  # (n_frames, n_atoms, 3)
+    if velocities is None:
+        raise RuntimeError("No frames found in dump file")
+    velocities = velocities[:n_frames]  # (n_frames, n_atoms, 3)
     print(f"  Total frames read: {velocities.shape[0]}, atoms: {velocities.shape[1]}")
     return velocities, types_ref, ids_ref
 
@@ -155,6 +275,10 @@ def compute_vacf_multi_origin(vels, n_initial, corlength_steps, ngap_steps,
                               dT, tfreq, label=""):
     """
     计算指定原子集合的多时间起点 VACF。
+
+    vels 为 float32：单个内积的相对误差约 1e-7 量级，
+    再对多个起点取平均，对 VACF/PDOS 完全够用；
+    归一化和 vacf_matrix 仍用 float64。
     """
     n_frames, n_atoms, _ = vels.shape
     dt_save = dT * tfreq
@@ -192,21 +316,46 @@ def compute_vacf_multi_origin(vels, n_initial, corlength_steps, ngap_steps,
 
     vacf_matrix = np.zeros((actual_ninit, corr_frames), dtype=float)
 
-    start_time = time.time()
-    for idx_k, init_idx in enumerate(init_indices):
+    def origin_row(idx_k, init_idx):
         v0 = vels[init_idx]             # (n_atoms, 3)
-        norm0 = np.sum(v0 * v0)
+        norm0 = np.sum(v0 * v0, dtype=np.float64)
         if norm0 == 0.0:
-            continue
+            return
 
-        for lag in range(corr_frames):
-            frame_idx = init_idx + lag
-            v = vels[frame_idx]
-            dot = np.sum(v * v0)        # sum_{i} v(t)·v(0)
-            vacf_matrix[idx_k, lag] = dot / norm0
+        # 所有 lag 一次算完：dots[lag] = sum_{i} v(init+lag)·v(0)
+        window = vels[init_idx:init_idx + corr_frames]   # (corr_frames, n_atoms, 3)
+        dots = np.einsum("fij,ij->f", window, v0, optimize=True)
+        vacf_matrix[idx_k] = dots / norm0
 
-        progress_bar(idx_k + 1, actual_ninit, start_time,
+    start_time = time.time()
+    n_span = last_init + corr_frames
+    if n_span <= 2 * actual_ninit * corr_frames:
+        # 各起点窗口大量重叠（常见情形）：一次 GEMM 算出所有帧与所有起点的内积
+        #   gram[f, k] = v(f)·v(init_k)，f < n_span
+        # 再按 f = init_k + lag 取出 (K, corr_frames)，轨迹只读一遍
+        init_arr = np.asarray(init_indices)
+        flat  = vels[:n_span].reshape(n_span, -1)          # (n_span, 3*n_atoms)
+        v0s   = flat[init_arr]                             # (K, 3*n_atoms)
+        norms = np.einsum("kd,kd->k", v0s, v0s, dtype=np.float64)
+        gram  = flat @ v0s.T                               # (n_span, K)
+        lag_idx = init_arr[:, None] + np.arange(corr_frames)
+        dots  = gram[lag_idx, np.arange(actual_ninit)[:, None]]
+        valid = norms != 0.0
+        vacf_matrix[valid] = dots[valid] / norms[valid, None]
+        progress_bar(actual_ninit, actual_ninit, start_time,
                      prefix=f"[VACF {label}]")
+    else:
+        # 起点间隔远大于相关长度时 GEMM 会算很多用不到的帧，改为逐起点：
+        # 各起点互相独立、只写 vacf_matrix 的不同行；einsum 计算时释放 GIL，
+        # 用线程池并行，进度条仍在主线程按完成顺序刷新
+        n_workers = min(actual_ninit, os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=n_workers) as pool:
+            futures = [pool.submit(origin_row, idx_k, init_idx)
+                       for idx_k, init_idx in enumerate(init_indices)]
+            for done, fut in enumerate(as_completed(futures), 1):
+                fut.result()
+                progress_bar(done, actual_ninit, start_time,
+                             prefix=f"[VACF {label}]")
 
     vacf = np.mean(vacf_matrix, axis=0)
     t    = np.arange(corr_frames, dtype=float) * dt_save
@@ -217,6 +366,44 @@ def compute_vacf_multi_origin(vels, n_initial, corlength_steps, ngap_steps,
 # 3. 从 VACF 计算 DOS（频率单位：THz）
 # ============================================================
 
+def _dos_kernel(vcorr_w, dtw, maxT, domaga):
+    """
+    DOS 的余弦变换内核：
+        dstate[ii] = sum_jj vcorr_w[jj] * cos(2π * ii*domaga * dtw[jj])
+    vcorr_w 已乘好高斯窗和 dT*TFREQ。装了 numba 时被 JIT 编译并按 ii 并行。
+    """
+    dstate = np.empty(maxT)
+    for ii in prange(maxT):
+        dw = ii * domaga
+        acc = 0.0
+        for jj in range(vcorr_w.shape[0]):
+            acc += vcorr_w[jj] * math.cos(2.0 * math.pi * dw * dtw[jj])
+        dstate[ii] = acc
+    return dstate
+
+
+if USE_JIT:
+    # cache=True：编译结果落盘，之后的运行直接加载
+    _dos_kernel = numba.njit(parallel=True, fastmath=True, cache=True)(_dos_kernel)
+
+
+def _dos_fft_length(domaga, dt_sample, r_corlength, maxT):
+    """
+    若频率间隔 domaga 恰好是采样间隔 dt_sample 对应的 FFT 分辨率，
+    即 N = 1 / (domaga * dt_sample) 为整数，则返回 N，否则返回 0。
+
+    还要求 N 不小于 VACF 点数（rfft 不截断输入），
+    且前 maxT 个频点都不超过 Nyquist 频率。
+    """
+    n_float = 1.0 / (domaga * dt_sample)
+    n_fft = int(round(n_float))
+    if abs(n_float - n_fft) > 1e-9 * n_float:
+        return 0
+    if n_fft < r_corlength or maxT > n_fft // 2 + 1:
+        return 0
+    return n_fft
+
+
 def compute_dos_from_vacf(vcorr, n_local_atoms, dT, corlength_steps,
                           tfreq, omaga_max, maxT):
     """
@@ -234,33 +421,59 @@ def compute_dos_from_vacf(vcorr, n_local_atoms, dT, corlength_steps,
     domaga = omaga_max / float(maxT)        # THz 间隔
     Tdelta = dT * corlength_steps * 0.5     # 高斯窗宽度（ps）
 
-    freq   = np.zeros(maxT, dtype=float)    # THz
-    dosval = np.zeros(maxT, dtype=float)
-
     print(f"Computing DOS: max freq = {omaga_max} THz, points = {maxT}")
-    start_time = time.time()
-    for ii in range(maxT):
-        dw = ii * domaga          # THz
-        dstate = 0.0
-        for jj in range(r_Corlength):
-            dtw = dT * jj * tfreq                    # 物理时间 (ps)
-            w_t = math.cos(2.0 * math.pi * dw * dtw) \
-                  * math.exp(- (dtw / Tdelta) ** 2)  # 窗函数 * cos
-            dstate += dT * tfreq * vcorr[jj] * w_t
-
-        # 横坐标直接用频率 THz
-        freq[ii]   = dw
-        # 纵坐标归一化因子保留原形式（只是整体尺度问题）
-        dosval[ii] = 6.0 * n_local_atoms * dstate * 0.31847
-
-        if (ii + 1) % max(1, maxT // 50) == 0:
-            progress_bar(ii + 1, maxT, start_time, prefix="[DOS]")
 
+    # 窗函数只与 jj 有关，先算好：dT*TFREQ * vcorr[jj] * exp(-(dtw/Tdelta)^2)
+    dtw    = dT * np.arange(r_Corlength, dtype=float) * tfreq   # 物理时间 (ps)
+    vcorr_w = dT * tfreq * np.asarray(vcorr[:r_Corlength], dtype=float) \
+              * np.exp(-(dtw / Tdelta) ** 2)
+
+    # 横坐标直接用频率 THz
+    freq = np.arange(maxT, dtype=float) * domaga
+
+    n_fft = _dos_fft_length(domaga, dT * tfreq, r_Corlength, maxT)
+    if n_fft:
+        # 频率网格与 FFT 格点重合：余弦变换 = rfft 的实部
+        dstate = np.fft.rfft(vcorr_w, n=n_fft)[:maxT].real
+    elif USE_JIT and maxT * r_Corlength >= JIT_MIN_WORK:
+        dstate = _dos_kernel(vcorr_w, dtw, maxT, domaga)
+    else:
+        # DOS = C @ vcorr_w，C[ii, jj] = cos(2π·freq[ii]·dtw[jj])；
+        # 按 DOS_BLOCK 行分块构造 C，限制临时矩阵的内存
+        dstate = np.empty(maxT, dtype=float)
+        start_time = time.time()
+        for i0 in range(0, maxT, DOS_BLOCK):
+            i1 = min(i0 + DOS_BLOCK, maxT)
+            cmat = np.cos((2.0 * math.pi) * np.outer(freq[i0:i1], dtw))
+            dstate[i0:i1] = cmat @ vcorr_w
+            progress_bar(i1, maxT, start_time, prefix="[DOS]")
+
+    # 纵坐标归一化因子保留原形式（只是整体尺度问题）
+    dosval = 6.0 * n_local_atoms * dstate * 0.31847
     return freq, dosval
 
 
 # ============================================================
-# 4. 主流程：读 dump -> 各类型 VACF+PDOS -> 总 VACF+DOS -> 画图
+# 4. 输出表格
+# ============================================================
+
+def save_table(stem, header, binary, **columns):
+    """
+    保存若干等长列到 stem.txt 或 stem.npz。
+
+    文本格式保留 8 位有效数字（速度本身是 float32，更多位数没有意义），
+    比 savetxt 默认的 %.18e 写得快、文件小；binary=True 时按列名存 npz，
+    np.load 读回基本就是 memcpy。
+    """
+    if binary:
+        np.savez(f"{stem}.npz", **columns)
+    else:
+        np.savetxt(f"{stem}.txt", np.column_stack(list(columns.values())),
+                   fmt="%.8g", header=header)
+
+
+# ============================================================
+# 5. 主流程：读 dump -> 各类型 VACF+PDOS -> 总 VACF+DOS -> 画图
 # ============================================================
 
 def main():
@@ -286,6 +499,8 @@ def main():
                         help=f"Max frequency in THz for DOS (OMAGA_MAX), default {DEFAULT_OMAGA_MAX}")
     parser.add_argument("--max-omega-points", type=int, default=DEFAULT_MAX_OMEGA_POINTS,
                         help=f"Number of frequency points for DOS (MAX_OMEGA_POINTS), default {DEFAULT_MAX_OMEGA_POINTS}")
+    parser.add_argument("--binary", action="store_true",
+                        help="Write VACF/DOS tables as .npz instead of .txt")
 
     args = parser.parse_args()
 
@@ -333,12 +548,10 @@ def main():
         dos_results[t]  = (freq, dosval)
 
         # 写出单独文本文件（freq 为 THz）
-        np.savetxt(f"{prefix}_VACF_type{t}.txt",
-                   np.column_stack([t_arr, vacf]),
-                   header="t(ps) VACF(t)")
-        np.savetxt(f"{prefix}_PDOS_type{t}.txt",
-                   np.column_stack([freq, dosval]),
-                   header="freq_THz PDOS")
+        save_table(f"{prefix}_VACF_type{t}", "t(ps) VACF(t)", args.binary,
+                   t=t_arr, vacf=vacf)
+        save_table(f"{prefix}_PDOS_type{t}", "freq_THz PDOS", args.binary,
+                   freq=freq, pdos=dosval)
 
     # ------- 全部原子总 VACF / 总 DOS ------- #
     print("\n=== Processing ALL atoms (total VACF & DOS) ===")
@@ -361,12 +574,10 @@ def main():
         maxT            = args.max_omega_points
     )
 
-    np.savetxt(f"{prefix}_VACF_total.txt",
-               np.column_stack([t_arr_total, vacf_total]),
-               header="t(ps) VACF_total(t)")
-    np.savetxt(f"{prefix}_DOS_total.txt",
-               np.column_stack([freq_total, dos_total]),
-               header="freq_THz DOS_total")
+    save_table(f"{prefix}_VACF_total", "t(ps) VACF_total(t)", args.binary,
+               t=t_arr_total, vacf=vacf_total)
+    save_table(f"{prefix}_DOS_total", "freq_THz DOS_total", args.binary,
+               freq=freq_total, dos=dos_total)
 
     # ====================================================
     # 画组图：上 VACF，下 PDOS（总 + 各类型）
@@ -398,7 +609,7 @@ def main():
 
     plt.tight_layout()
     figfile = f"{prefix}_VACF_PDOS.png"
-    plt.savefig(figfile, dpi=300)
+    plt.savefig(figfile, dpi=300, pil_kwargs={"compress_level": 3})
     plt.close()
     print(f"\nAll done. Figure saved to: {figfile}")
 
@@ -15,10 +15,36 @@ python RDF.py wrapped-1.traj --fmt lammps --mode avg --cutoff 10 --bins 150 --ty
 
 import numpy as np
 import argparse
+import io
 import os
+import re
+import math
+import mmap
+from concurrent.futures import ProcessPoolExecutor
 import matplotlib.pyplot as plt
 from math import exp, sqrt, pi
 
+# numba 可选：装了就用 JIT 内核遍历 cell list 并直接分箱；
+# 设 RDF_NO_JIT=1 可强制走 NumPy 路径
+try:
+    import numba
+    from numba import prange, cuda
+except ImportError:
+    numba = None
+    prange = range
+    cuda = None
+
+USE_JIT = numba is not None and os.environ.get("RDF_NO_JIT", "") in ("", "0")
+
+# scipy 可选：gaussian 平滑用 gaussian_filter1d，没装退回 np.convolve
+try:
+    from scipy.ndimage import gaussian_filter1d
+except ImportError:
+    gaussian_filter1d = None
+JIT_MIN_ATOMS = 2000    # 原子数小于此值时 JIT 编译开销不划算
+PBC_BLOCK_ELEMS = 1 << 18   # distances_pbc 每个行块的元素数（约 2 MB）
+GPU_THREADS = 128           # --device gpu 时每个 CUDA block 的线程数
+
 
 # =========================================================
 # Utility
@@ -31,8 +57,10 @@ def frac_to_cart(frac, lattice):
     return frac @ lattice
 
 
-def cart_to_frac(cart, lattice):
-    return cart @ np.linalg.inv(lattice)
+def cart_to_frac(cart, lattice, lat_inv=None):
+    if lat_inv is None:
+        lat_inv = np.linalg.inv(lattice)
+    return cart @ lat_inv
 
 
 # =========================================================
@@ -73,20 +101,15 @@ def read_xdatcar(xfile):
     mode = "direct" if "direct" in lines[last].lower() else "cart"
     N = counts.sum()
 
-    coords = np.array([
-        [float(x) for x in lines[last + 1 + j].split()[:3]]
-        for j in range(N)
-    ])
+    coords = np.loadtxt(lines[last + 1:last + 1 + N], usecols=(0, 1, 2), ndmin=2)
 
-    types = []
-    for i, c in enumerate(counts):
-        types += [i + 1] * c
-    types = np.array(types, dtype=int)
+    types = np.repeat(np.arange(1, len(counts) + 1), counts)
 
     if mode == "direct":
         pos = frac_to_cart(coords, lattice)
     else:
         pos = coords * scale
+    pos = pos.astype(np.float32)    # 坐标存 float32，RDF 的分箱精度足够
 
     volume = abs(np.linalg.det(lattice))
     return [pos], [types], [lattice], volume, species
@@ -95,118 +118,503 @@ def read_xdatcar(xfile):
 # =========================================================
 # Read LAMMPS dump (your exact format)
 # =========================================================
-def read_lammps_all_frames(path):
-    """读取 LAMMPS dump，自动识别 2 列(lo/hi) 或 3 列(含 xy xz yz) box 格式"""
-    frames = []
-    with open(path, "r") as f:
-        lines = f.readlines()
-
-    i = 0
-    N = len(lines)
-    while i < N:
-        # TIMESTEP
-        if not lines[i].startswith("ITEM: TIMESTEP"):
-            i += 1
-            continue
-        step = int(lines[i+1].strip())
-
-        # NUMBER OF ATOMS
-        if not lines[i+2].startswith("ITEM: NUMBER OF ATOMS"):
-            raise RuntimeError("Missing 'ITEM: NUMBER OF ATOMS'")
-        natoms = int(lines[i+3].strip())
-
-        # BOX BOUNDS
-        if not lines[i+4].startswith("ITEM: BOX BOUNDS"):
-            raise RuntimeError("Missing 'ITEM: BOX BOUNDS'")
-
-        box = []
-        for j in range(3):
-            parts = lines[i+5+j].split()
-            if len(parts) == 2:
-                # lo hi
-                lo, hi = map(float, parts)
-                tilt = 0.0
-            elif len(parts) == 3:
-                # lo hi tilt
-                lo, hi, tilt = map(float, parts)
-            else:
-                raise RuntimeError(f"BOX line format error: {parts}")
-            box.append((lo, hi, tilt))
-
-        # 构建正交盒（RDF 不关心倾斜，直接用长方体即可）
-        ax = np.array([box[0][1] - box[0][0], 0.0, 0.0])
-        by = np.array([0.0, box[1][1] - box[1][0], 0.0])
-        cz = np.array([0.0, 0.0, box[2][1] - box[2][0]])
-        cell = np.vstack([ax, by, cz])
-        vol = float(abs(np.linalg.det(cell)))
-
-        # ATOMS
-        if not lines[i+8].startswith("ITEM: ATOMS"):
-            raise RuntimeError("Missing 'ITEM: ATOMS'")
-        header = lines[i+8].split()[2:]
-        col = {h: k for k, h in enumerate(header)}
-        if "type" not in col:
-            raise RuntimeError("Missing type column")
-
-        X = []
-        T = []
-        for k in range(natoms):
-            parts = lines[i+9+k].split()
-            T.append(int(parts[col["type"]]))
-            X.append([float(parts[col[c]]) for c in ("x", "y", "z")])
-        X = np.array(X, float)
-        T = np.array(T, int)
-
-        # 平移到 box 原点
-        X[:, 0] -= box[0][0]
-        X[:, 1] -= box[1][0]
-        X[:, 2] -= box[2][0]
-
-        # ✅ 这里一次性返回 4 个量：pos, typ, cell, vol
-        frames.append((X, T, cell, vol))
-
-        i += 9 + natoms
-
-    return frames
+def find_frame_offsets(mm):
+    """
+    用正则在 mmap 上一次扫出所有行首 'ITEM: TIMESTEP' 的字节偏移。
+    不用 re.MULTILINE 的 '^'：纯字面量模式走快速查找，行首再单独判断。
+    """
+    return [m.start() for m in re.finditer(rb"ITEM: TIMESTEP", mm)
+            if m.start() == 0 or mm[m.start() - 1] == 0x0A]
+
+
+def parse_lammps_frame(buf):
+    """
+    解析一帧（从 'ITEM: TIMESTEP' 开始的 bytes），返回 (pos, typ, cell, vol)。
+    每帧自成一体，可单独交给别的进程解析。
+    """
+    lines = buf.split(b"\n", 9)
+    if len(lines) < 10:
+        raise RuntimeError("Incomplete frame header")
+    lines, body = [l.decode() for l in lines[:9]], lines[9]
+    step = int(lines[1].strip())
+
+    # NUMBER OF ATOMS
+    if not lines[2].startswith("ITEM: NUMBER OF ATOMS"):
+        raise RuntimeError("Missing 'ITEM: NUMBER OF ATOMS'")
+    natoms = int(lines[3].strip())
+
+    # BOX BOUNDS
+    if not lines[4].startswith("ITEM: BOX BOUNDS"):
+        raise RuntimeError("Missing 'ITEM: BOX BOUNDS'")
+
+    box = []
+    for j in range(3):
+        parts = lines[5 + j].split()
+        if len(parts) == 2:
+            # lo hi
+            lo, hi = map(float, parts)
+            tilt = 0.0
+        elif len(parts) == 3:
+            # lo hi tilt
+            lo, hi, tilt = map(float, parts)
+        else:
+            raise RuntimeError(f"BOX line format error: {parts}")
+        box.append((lo, hi, tilt))
+
+    # 构建正交盒（RDF 不关心倾斜，直接用长方体即可）
+    ax = np.array([box[0][1] - box[0][0], 0.0, 0.0])
+    by = np.array([0.0, box[1][1] - box[1][0], 0.0])
+    cz = np.array([0.0, 0.0, box[2][1] - box[2][0]])
+    cell = np.vstack([ax, by, cz])
+    vol = float(abs(np.linalg.det(cell)))
+
+    # ATOMS
+    if not lines[8].startswith("ITEM: ATOMS"):
+        raise RuntimeError("Missing 'ITEM: ATOMS'")
+    header = lines[8].split()[2:]
+    col = {h: k for k, h in enumerate(header)}
+    if "type" not in col:
+        raise RuntimeError("Missing type column")
+
+    usecols = (col["type"], col["x"], col["y"], col["z"])
+    arr = np.loadtxt(io.BytesIO(body), usecols=usecols, max_rows=natoms, ndmin=2)
+    if len(arr) != natoms:
+        raise RuntimeError(f"Incomplete ATOMS block at step {step}")
+    T = arr[:, 0].astype(int)
+    X = arr[:, 1:4].copy()
+
+    # 平移到 box 原点
+    X[:, 0] -= box[0][0]
+    X[:, 1] -= box[1][0]
+    X[:, 2] -= box[2][0]
+    X = X.astype(np.float32)    # 平移后再降到 float32
+
+    # ✅ 这里一次性返回 4 个量：pos, typ, cell, vol
+    return X, T, cell, vol
+
+
+def _parse_frame_at(task):
+    """进程池任务：task = (path, start, end)，自己 mmap 文件解析这一帧"""
+    path, start, end = task
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return parse_lammps_frame(mm[start:end])
+
+
+def read_lammps_all_frames(path, workers=1):
+    """
+    读取 LAMMPS dump，自动识别 2 列(lo/hi) 或 3 列(含 xy xz yz) box 格式。
+    mmap 整个文件，正则一次扫出帧起点，再逐帧用 np.loadtxt 解析 ATOMS 块；
+    workers > 1 时各帧按偏移分给多个进程并行解析。
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            offsets = find_frame_offsets(mm)
+            ends = offsets[1:] + [len(mm)]
+            if workers <= 1 or len(offsets) <= 1:
+                return [parse_lammps_frame(mm[a:b]) for a, b in zip(offsets, ends)]
+
+    tasks = [(path, a, b) for a, b in zip(offsets, ends)]
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as ex:
+        return list(ex.map(_parse_frame_at, tasks))
 
 # =========================================================
-# pairwise distances
+# pairwise distances / cell list
 # =========================================================
-def distances_pbc(pos, lattice):
-    frac = cart_to_frac(pos, lattice)
-    df = frac[:, None, :] - frac[None, :, :]
-    df = minimum_image(df)
-    dc = df @ lattice
-    d = np.linalg.norm(dc, axis=-1)
-    return d
-
-
-def partial_dist(pos, lattice, types, ta, tb):
-    fa = pos[types == ta]
-    fb = pos[types == tb]
-    if len(fa) == 0 or len(fb) == 0:
-        return np.array([])
-    frac_a = cart_to_frac(fa, lattice)
-    frac_b = cart_to_frac(fb, lattice)
-    df = frac_a[:, None, :] - frac_b[None, :, :]
-    df = minimum_image(df)
-    dc = df @ lattice
-    d = np.linalg.norm(dc, axis=-1)
-    d = d.reshape(-1)
-    return d[d > 0]
+def distances_pbc(pos, lattice, lat_inv=None):
+    """
+    全矩阵距离（cell list 格子不足时的退路）。
+    |p-q|² = p·p + q·q - 2 p·q，p·q 走一次 GEMM；对 27 个周期镜像取最小值，
+    不再构造 (N, N, 3) 的差矢量张量。距离矩阵用 float32。
+    """
+    frac = cart_to_frac(pos, lattice, lat_inv)
+    frac -= np.floor(frac)
+    lat32 = lattice.astype(np.float32)
+    p = (frac @ lattice).astype(np.float32)
+    sq = np.einsum("ij,ij->i", p, p)
+    shifts = [(np.array(s, dtype=np.float32) - 1) @ lat32 for s in np.ndindex(3, 3, 3)]
+    shifts = [t for t in shifts if t.any()]
+    tp = [p @ t for t in shifts]
+
+    # 镜像 t 只是秩一修正：|p_i - p_j - t|² = d0 - 2 t·p_i + 2 t·p_j + |t|²；
+    # 按行分块，让 27 次取最小都在缓存里完成
+    n = len(p)
+    d2 = np.empty((n, n), dtype=np.float32)
+    blk = max(1, PBC_BLOCK_ELEMS // max(n, 1))
+    for r0 in range(0, n, blk):
+        r1 = min(n, r0 + blk)
+        d0 = sq[r0:r1, None] + sq[None, :]
+        d0 -= 2.0 * (p[r0:r1] @ p.T)
+        out = d2[r0:r1]
+        out[:] = d0
+        cur = np.empty_like(d0)
+        for t, tpk in zip(shifts, tp):
+            np.add(d0, (t @ t - 2.0 * tpk[r0:r1])[:, None], out=cur)
+            cur += 2.0 * tpk[None, :]
+            np.minimum(out, cur, out=out)
+
+    # 自身对精确为 0；消去误差可能给出极小的负数
+    np.fill_diagonal(d2, 0.0)
+    np.maximum(d2, 0.0, out=d2)
+    return np.sqrt(d2)
+
+
+def cell_list_pairs(pos, lattice, cutoff, lat_inv=None):
+    """
+    linked-cell 近邻搜索：返回所有 0 < d < cutoff 的原子对 (i, j, d)，
+    每对只出现一次（半邻居表：13 个正向相邻格子 + 本格子内 i < j）。
+    每个方向格子数 n = floor(晶面间距 / cutoff)；某方向 n < 3 时相邻格子
+    会重复计数，退回 distances_pbc 全矩阵最小镜像（取上三角）。
+    """
+    inv = np.linalg.inv(lattice) if lat_inv is None else lat_inv
+    # 晶面间距 = 1 / |inv 的第 k 列|
+    widths = 1.0 / np.linalg.norm(inv, axis=0)
+    ncell = np.floor(widths / cutoff).astype(int)
+    if np.any(ncell < 3):
+        d = distances_pbc(pos, lattice, inv)
+        i, j = np.nonzero(np.triu((d > 0) & (d < cutoff), 1))
+        return i, j, d[i, j]
+
+    frac = pos @ inv
+    frac -= np.floor(frac)
+    cidx = np.floor(frac * ncell).astype(int) % ncell
+    wrapped = (frac @ lattice).astype(np.float32)
+
+    # 每个格子里的原子下标，按最大占据数补 -1 成矩阵
+    flat = (cidx[:, 0] * ncell[1] + cidx[:, 1]) * ncell[2] + cidx[:, 2]
+    n_cells = int(np.prod(ncell))
+    order = np.argsort(flat, kind="stable")
+    counts = np.bincount(flat, minlength=n_cells)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    m = int(counts.max())
+    slot = np.arange(len(flat)) - starts[flat[order]]
+    members = np.full((n_cells, m), -1, dtype=np.int64)
+    members[flat[order], slot] = order
+    valid = members >= 0
+    # SoA 布局 (3, 格子, 槽位)：距离按候选原子方向连续计算，而不是在长度 3 的 xyz 轴上归约
+    pos_pad = np.ascontiguousarray(wrapped[np.where(valid, members, 0)].transpose(2, 0, 1))
+
+    cells = np.indices(ncell).reshape(3, -1).T
+    out_i, out_j, out_d = [], [], []
+    upper = np.triu(np.ones((m, m), dtype=bool), 1)
+    for shift in np.ndindex(3, 3, 3):
+        shift = np.array(shift) - 1
+        # 只取字典序 ≥ 0 的一半平移：-s 方向的原子对已由 s 方向给出
+        if tuple(shift) < (0, 0, 0):
+            continue
+        nb = cells + shift
+        # 越过边界的格子对应平移一个晶格矢量的镜像：Δ = image · lattice
+        image = np.floor_divide(nb, ncell)
+        nb -= image * ncell
+        nb_flat = (nb[:, 0] * ncell[1] + nb[:, 1]) * ncell[2] + nb[:, 2]
+        delta = (image @ lattice).astype(np.float32)
+
+        r2 = None
+        for k in range(3):
+            pj = pos_pad[k][nb_flat] + delta[:, k, None]
+            dk = pos_pad[k][:, :, None] - pj[:, None, :]
+            dk *= dk
+            r2 = dk if r2 is None else r2 + dk
+        d = np.sqrt(r2)
+        mask = valid[:, :, None] & valid[nb_flat][:, None, :]
+        mask &= (d > 0) & (d < cutoff)
+        if not shift.any():
+            # 本格子内槽位按原子序号递增，a < b 即 i < j
+            mask &= upper
+        c, a, b = np.nonzero(mask)
+        out_i.append(members[c, a])
+        out_j.append(members[nb_flat[c], b])
+        out_d.append(d[c, a, b])
+
+    return np.concatenate(out_i), np.concatenate(out_j), np.concatenate(out_d)
+
+
+def bin_index(d, edges):
+    """
+    均匀分箱的整数下标：b = int((d - edges[0]) * bins / 宽度)，
+    再用 edges 校正一格，结果与 np.histogram 逐个一致。d 须落在 [edges[0], edges[-1]]。
+    """
+    nbins = len(edges) - 1
+    inv_dr = nbins / (edges[-1] - edges[0])
+    b = ((d - edges[0]) * inv_dr).astype(np.intp)
+    np.minimum(b, nbins - 1, out=b)
+    b -= d < edges[b]
+    b += (d >= edges[b + 1]) & (b < nbins - 1)
+    return b
+
+
+def _accumulate_rdf(pos, types, lattice, ncell, head, next_, cutoff,
+                    edges, ntypes, nchunk):
+    """
+    cell list 上的 RDF 分箱内核：pos 已折回晶胞，head/next_ 为每个格子的
+    链表。半邻居表：每个原子只遍历 13 个正向相邻格子和本格子内 j > i
+    （越界格子平移 image·lattice），每对 0 < d < cutoff 的原子只按
+    (types[i], types[j]) 计一次。
+    按格子分成 nchunk 段并行，每段写自己的直方图，最后求和，不需要原子操作。
+    分箱规则与 np.histogram 一致（先按均匀间隔取整，再用 edges 校正）。
+    """
+    nbins = edges.shape[0] - 1
+    inv_dr = nbins / (edges[nbins] - edges[0])
+    cut2 = cutoff * cutoff
+    nx, ny, nz = ncell[0], ncell[1], ncell[2]
+    n_cells = nx * ny * nz
+    hist = np.zeros((nchunk, ntypes, ntypes, nbins), dtype=np.int64)
+
+    for k in prange(nchunk):
+        c0 = k * n_cells // nchunk
+        c1 = (k + 1) * n_cells // nchunk
+        for c in range(c0, c1):
+            cx = c // (ny * nz)
+            cy = (c // nz) % ny
+            cz = c % nz
+            for sx in range(-1, 2):
+                for sy in range(-1, 2):
+                    for sz in range(-1, 2):
+                        # 半邻居表：只走字典序 ≥ 0 的 14 个格子
+                        if sx < 0 or (sx == 0 and (sy < 0 or (sy == 0 and sz < 0))):
+                            continue
+                        own = sx == 0 and sy == 0 and sz == 0
+                        ix = cx + sx
+                        iy = cy + sy
+                        iz = cz + sz
+                        # 越界格子 → 对面的格子 + 一个晶格矢量的镜像
+                        mx = (ix + nx) // nx - 1
+                        my = (iy + ny) // ny - 1
+                        mz = (iz + nz) // nz - 1
+                        nb = ((ix - mx * nx) * ny + (iy - my * ny)) * nz + (iz - mz * nz)
+                        # 镜像平移按 float64 算好再降到 float32，与 NumPy 路径一致
+                        ddx = np.float32(mx * lattice[0, 0] + my * lattice[1, 0] + mz * lattice[2, 0])
+                        ddy = np.float32(mx * lattice[0, 1] + my * lattice[1, 1] + mz * lattice[2, 1])
+                        ddz = np.float32(mx * lattice[0, 2] + my * lattice[1, 2] + mz * lattice[2, 2])
+
+                        i = head[c]
+                        while i >= 0:
+                            ti = types[i]
+                            # 本格子内链表按序号递增，从 next_[i] 开始即 j > i
+                            j = next_[i] if own else head[nb]
+                            while j >= 0:
+                                dx = pos[i, 0] - (pos[j, 0] + ddx)
+                                dy = pos[i, 1] - (pos[j, 1] + ddy)
+                                dz = pos[i, 2] - (pos[j, 2] + ddz)
+                                r2 = dx * dx + dy * dy + dz * dz
+                                if r2 > 0.0 and r2 < cut2:
+                                    d = math.sqrt(r2)
+                                    b = int((d - edges[0]) * inv_dr)
+                                    if b > 0 and d < edges[b]:
+                                        b -= 1
+                                    elif b < nbins - 1 and d >= edges[b + 1]:
+                                        b += 1
+                                    if b < nbins:
+                                        hist[k, ti, types[j], b] += 1
+                                j = next_[j]
+                            i = next_[i]
+
+    out = np.zeros((ntypes, ntypes, nbins), dtype=np.int64)
+    for k in range(nchunk):
+        out += hist[k]
+    return out
+
+
+if USE_JIT:
+    # cache=True：编译结果落盘，之后的运行直接加载
+    # 不开 contract/reassoc：float32 下 FMA 会让贴着箱边的距离换箱，与 NumPy 路径不一致
+    _accumulate_rdf = numba.njit(parallel=True, cache=True,
+                                 fastmath={"nnan", "ninf", "nsz", "arcp", "afn"})(_accumulate_rdf)
+
+
+def _build_cell_list(pos, lattice, cutoff, lat_inv=None):
+    """
+    JIT/GPU 内核共用的链表式 cell list：返回 (wrapped, ncell, flat, head, next_)，
+    head[c] 为格子 c 的第一个原子，next_[i] 为同格子的下一个原子，-1 表示结束。
+    任一方向格子数 < 3 时返回 None。
+    """
+    inv = np.linalg.inv(lattice) if lat_inv is None else lat_inv
+    widths = 1.0 / np.linalg.norm(inv, axis=0)
+    ncell = np.floor(widths / cutoff).astype(np.int64)
+    if np.any(ncell < 3):
+        return None
+
+    frac = pos @ inv
+    frac -= np.floor(frac)
+    cidx = np.floor(frac * ncell).astype(np.int64) % ncell
+    wrapped = np.ascontiguousarray(frac @ lattice, dtype=np.float32)
+    flat = (cidx[:, 0] * ncell[1] + cidx[:, 1]) * ncell[2] + cidx[:, 2]
+
+    n_cells = int(np.prod(ncell))
+    order = np.argsort(flat, kind="stable")
+    fo = flat[order]
+    first = np.ones(len(fo), dtype=bool)
+    first[1:] = fo[1:] != fo[:-1]
+    head = np.full(n_cells, -1, dtype=np.int64)
+    head[fo[first]] = order[first]
+    next_ = np.full(len(flat), -1, dtype=np.int64)
+    same = ~first[1:]
+    next_[order[:-1][same]] = order[1:][same]
+    return wrapped, ncell, flat, head, next_
+
+
+def pair_histograms_jit(pos, lattice, type_idx, ntypes, cutoff, edges, lat_inv=None):
+    """
+    用 _accumulate_rdf 直接得到 hist[ta, tb, bin]（type_idx 为 0 起的类型序号）。
+    任一方向格子数 < 3 时返回 None，由调用方走 NumPy 路径。
+    """
+    cl = _build_cell_list(pos, lattice, cutoff, lat_inv)
+    if cl is None:
+        return None
+    wrapped, ncell, _, head, next_ = cl
+
+    nchunk = min(int(np.prod(ncell)), 4 * numba.get_num_threads())
+    return _accumulate_rdf(wrapped, type_idx.astype(np.int64),
+                           np.ascontiguousarray(lattice, dtype=float),
+                           ncell, head, next_, float(cutoff),
+                           np.asarray(edges, dtype=float), ntypes, nchunk)
+
+
+def _accumulate_rdf_gpu(pos, types, lattice, ncell, cell_of, head, next_,
+                        cutoff, edges, hist):
+    """
+    _accumulate_rdf 的 CUDA 版本：每个线程负责一个原子 i，同样只走半邻居表，
+    用 atomic add 写入全局 hist[ti, tj, bin]。
+    直方图大小随 bins/类型数变化，放不进编译期定长的 shared memory，故不做分块私有化。
+    """
+    i = cuda.grid(1)
+    if i >= pos.shape[0]:
+        return
+    nbins = edges.shape[0] - 1
+    inv_dr = nbins / (edges[nbins] - edges[0])
+    cut2 = cutoff * cutoff
+    nx = ncell[0]
+    ny = ncell[1]
+    nz = ncell[2]
+    c = cell_of[i]
+    cx = c // (ny * nz)
+    cy = (c // nz) % ny
+    cz = c % nz
+    ti = types[i]
+    for sx in range(-1, 2):
+        for sy in range(-1, 2):
+            for sz in range(-1, 2):
+                if sx < 0 or (sx == 0 and (sy < 0 or (sy == 0 and sz < 0))):
+                    continue
+                ix = cx + sx
+                iy = cy + sy
+                iz = cz + sz
+                mx = (ix + nx) // nx - 1
+                my = (iy + ny) // ny - 1
+                mz = (iz + nz) // nz - 1
+                nb = ((ix - mx * nx) * ny + (iy - my * ny)) * nz + (iz - mz * nz)
+                # 镜像平移按 float64 算好再降到 float32，与 NumPy 路径一致
+                ddx = np.float32(mx * lattice[0, 0] + my * lattice[1, 0] + mz * lattice[2, 0])
+                ddy = np.float32(mx * lattice[0, 1] + my * lattice[1, 1] + mz * lattice[2, 1])
+                ddz = np.float32(mx * lattice[0, 2] + my * lattice[1, 2] + mz * lattice[2, 2])
+                j = next_[i] if (sx == 0 and sy == 0 and sz == 0) else head[nb]
+                while j >= 0:
+                    dx = pos[i, 0] - (pos[j, 0] + ddx)
+                    dy = pos[i, 1] - (pos[j, 1] + ddy)
+                    dz = pos[i, 2] - (pos[j, 2] + ddz)
+                    r2 = dx * dx + dy * dy + dz * dz
+                    if r2 > 0.0 and r2 < cut2:
+                        d = math.sqrt(r2)
+                        b = int((d - edges[0]) * inv_dr)
+                        if b > 0 and d < edges[b]:
+                            b -= 1
+                        elif b < nbins - 1 and d >= edges[b + 1]:
+                            b += 1
+                        if b < nbins:
+                            cuda.atomic.add(hist, (ti, types[j], b), 1)
+                    j = next_[j]
+
+
+if cuda is not None:
+    _accumulate_rdf_gpu = cuda.jit(_accumulate_rdf_gpu)
+
+
+def accumulate_rdf_gpu(pos, lattice, type_idx, ntypes, cutoff, edges, lat_inv=None):
+    """
+    在 GPU 上得到 hist[ta, tb, bin]，结果与 pair_histograms 的 CPU 路径一致。
+    任一方向格子数 < 3 时返回 None，由调用方走 CPU 路径。
+    """
+    cl = _build_cell_list(pos, lattice, cutoff, lat_inv)
+    if cl is None:
+        return None
+    wrapped, ncell, flat, head, next_ = cl
+
+    nbins = len(edges) - 1
+    hist = cuda.to_device(np.zeros((ntypes, ntypes, nbins), dtype=np.int64))
+    threads = GPU_THREADS
+    blocks = (len(wrapped) + threads - 1) // threads
+    _accumulate_rdf_gpu[blocks, threads](
+        cuda.to_device(wrapped), cuda.to_device(type_idx.astype(np.int64)),
+        cuda.to_device(np.ascontiguousarray(lattice, dtype=float)),
+        cuda.to_device(ncell), cuda.to_device(flat), cuda.to_device(head),
+        cuda.to_device(next_), float(cutoff),
+        cuda.to_device(np.asarray(edges, dtype=float)), hist)
+    return hist.copy_to_host()
+
+
+def pair_histograms(pos, lattice, type_idx, ntypes, cutoff, edges, device="cpu",
+                    lat_inv=None):
+    """
+    一帧的有序原子对直方图 hist[type_i, type_j, bin]，total 与各 partial 都从它
+    求和/切片得到。各路径只遍历 i < j 的半数原子对，得到 half 后按牛顿第三定律
+    hist = half + half 交换类型轴，补回 (j, i) 方向。device="gpu" 时用 CUDA 内核。
+    """
+    half = None
+    if device == "gpu":
+        half = accumulate_rdf_gpu(pos, lattice, type_idx, ntypes, cutoff, edges, lat_inv)
+
+    if half is None and USE_JIT and len(pos) >= JIT_MIN_ATOMS:
+        half = pair_histograms_jit(pos, lattice, type_idx, ntypes, cutoff, edges, lat_inv)
+
+    if half is None:
+        i, j, d = cell_list_pairs(pos, lattice, cutoff, lat_inv)
+        nbins = len(edges) - 1
+        code = (type_idx[i] * ntypes + type_idx[j]) * nbins + bin_index(d, edges)
+        half = np.bincount(code, minlength=ntypes * ntypes * nbins)
+        half = half.reshape(ntypes, ntypes, nbins)
+
+    return half + half.transpose(1, 0, 2)
+
+
+def compute_frame_hist(task):
+    """
+    单帧任务（可 pickle，供 ProcessPoolExecutor 调用）：
+    task = (pos, typ, cell, all_types, cutoff, edges, device)，返回 pair_histograms 的 hist。
+    首帧没有的类型归到最后一格：只计入 total。
+    """
+    pos, typ, cell, all_types, cutoff, edges, device = task
+    lut = np.full(max(int(typ.max()), int(all_types[-1])) + 1, len(all_types))
+    lut[np.asarray(all_types)] = np.arange(len(all_types))
+    type_idx = lut[typ]
+    # 逆晶格每帧只求一次，传给各条路径
+    lat_inv = np.linalg.inv(cell)
+    return pair_histograms(pos, cell, type_idx, len(all_types) + 1,
+                           cutoff, edges, device, lat_inv)
+
+
+def _init_worker():
+    if numba is not None:
+        numba.set_num_threads(1)
 
 
 # =========================================================
 # RDF normalize
 # =========================================================
-def rdf_normalize(counts, edges, Na, Nb, volume):
+def rdf_shells(edges):
+    """bin 中心 r 与球壳体积 4πr²dr，只依赖 edges，整个运行只算一次"""
     r = 0.5 * (edges[:-1] + edges[1:])
     dr = np.diff(edges)
     shell = 4 * pi * r**2 * dr
+    return r, shell
+
+
+def rdf_normalize(counts, shell, Na, Nb, volume):
     rho = Nb / volume
     denom = Na * rho * shell
     g = counts / denom
-    return r, g
+    return g
 
 
 # =========================================================
@@ -216,10 +624,16 @@ def smooth(y, mode, w=5, sigma=1.0):
     if mode == "off":
         return y
     if mode == "moving":
-        k = np.ones(w) / w
-        return np.convolve(y, k, "same")
+        # 累加和做滑动平均，O(N) 与窗口无关；两端补零，与 np.convolve(..., "same") 对齐
+        yp = np.concatenate([np.zeros(w // 2), y, np.zeros((w - 1) // 2)])
+        cs = np.concatenate([[0.0], np.cumsum(yp)])
+        return (cs[w:] - cs[:-w]) / w
     if mode == "gaussian":
         hw = int(3 * sigma)
+        if gaussian_filter1d is not None and hw > 0:
+            # 截断半宽取 hw、边界补零，结果与下面的 np.convolve 相同
+            return gaussian_filter1d(np.asarray(y, float), sigma, mode="constant",
+                                     cval=0.0, truncate=hw / sigma)
         xs = np.arange(-hw, hw + 1)
         k = np.exp(-0.5 * (xs / sigma)**2)
         k /= k.sum()
@@ -246,14 +660,21 @@ def main():
     ap.add_argument("--sigma", type=float, default=1.0)
     ap.add_argument("--out", default="rdf.png")
     ap.add_argument("--txt", default="rdf.txt")
+    ap.add_argument("--device", choices=["cpu", "gpu"], default="cpu",
+                    help="gpu: 用 numba.cuda 在 GPU 上统计原子对")
+    ap.add_argument("--workers", type=int, default=0,
+                    help="并行处理帧的进程数，0 表示 CPU 核数")
     args = ap.parse_args()
 
+    if args.device == "gpu" and (cuda is None or not cuda.is_available()):
+        raise RuntimeError("--device gpu needs numba with a CUDA-capable GPU")
+
     # ---------------- LOAD ----------------
     if args.fmt == "xdatcar":
         posL, typL, cellL, vol, species = read_xdatcar(args.input)
         frames = list(zip(posL, typL, cellL, [vol]*len(posL)))
     else:
-        frames = read_lammps_all_frames(args.input)
+        frames = read_lammps_all_frames(args.input, args.workers or os.cpu_count() or 1)
         species = None
 
     print(f"[INFO] total frames={len(frames)}")
@@ -286,6 +707,7 @@ def main():
     print(f"[INFO] cutoff={args.cutoff}")
 
     edges = np.linspace(0, args.cutoff, args.bins + 1)
+    r, shell = rdf_shells(edges)
 
     # detect types
     all_types = np.unique(use[0][1])
@@ -298,24 +720,26 @@ def main():
                     for ta in all_types for tb in all_types if tb >= ta}
 
     # ---------------- accumulate over frames ----------------
-    for pos, typ, cell, vol in use:
-        # total RDF
-        d_all = distances_pbc(pos, cell).ravel()
-        d_all = d_all[(d_all > 0) & (d_all < args.cutoff)]
-        h, _ = np.histogram(d_all, bins=edges)
-        total_hist += h
-
-        # partial RDF
-        for ta in all_types:
-            Na = np.sum(typ == ta)
-            for tb in all_types:
-                if tb < ta:
-                    continue
-                Nb = np.sum(typ == tb)
-                d = partial_dist(pos, cell, typ, ta, tb)
-                d = d[(d > 0) & (d < args.cutoff)]
-                h, _ = np.histogram(d, bins=edges)
-                partial_hist[(ta, tb)] += h
+    # 各帧互相独立：多进程并行，每个进程内 numba 只用 1 线程避免超订；
+    # GPU 模式只在主进程里跑
+    tasks = [(pos, typ, cell, all_types, args.cutoff, edges, args.device)
+             for pos, typ, cell, vol in use]
+    nworkers = 1 if args.device == "gpu" else min(args.workers or os.cpu_count() or 1, len(tasks))
+    hist_sum = 0
+    if nworkers > 1:
+        chunk = max(1, len(tasks) // (nworkers * 4))
+        with ProcessPoolExecutor(max_workers=nworkers, initializer=_init_worker) as ex:
+            for hist in ex.map(compute_frame_hist, tasks, chunksize=chunk):
+                hist_sum = hist_sum + hist
+    else:
+        for task in tasks:
+            hist_sum = hist_sum + compute_frame_hist(task)
+
+    total_hist += hist_sum.sum(axis=(0, 1))
+    for a, ta in enumerate(all_types):
+        for b, tb in enumerate(all_types):
+            if tb >= ta:
+                partial_hist[(ta, tb)] += hist_sum[a, b]
 
     # average
     nf = len(use)
@@ -326,18 +750,16 @@ def main():
     # ---------------- normalize ----------------
     pos0, typ0, cell0, vol0 = use[0]
     Na_total = len(typ0)
+    n_by_type = np.bincount(typ0)     # 每种类型的原子数，一次算好
 
-    r, g_total = rdf_normalize(
-        total_hist, edges, Na_total, Na_total, vol0
-    )
+    g_total = rdf_normalize(total_hist, shell, Na_total, Na_total, vol0)
 
     # partial
     partial_rdf = {}
     for (ta, tb), h in partial_hist.items():
-        Na = np.sum(typ0 == ta)
-        Nb = np.sum(typ0 == tb)
-        r, g = rdf_normalize(h, edges, Na, Nb, vol0)
-        partial_rdf[(ta, tb)] = g
+        Na = n_by_type[ta]
+        Nb = n_by_type[tb]
+        partial_rdf[(ta, tb)] = rdf_normalize(h, shell, Na, Nb, vol0)
 
     # smoothing
     g_total = smooth(g_total, args.smooth, args.window, args.sigma)
@@ -349,25 +771,16 @@ def main():
     # =========================================================
     # TXT OUTPUT (Format A)
     # =========================================================
-    with open(args.txt, "w") as f:
-        header = ["r", "g_total"]
-        for ta in all_types:
-            for tb in all_types:
-                if tb < ta:
-                    continue
-                nm = f"g_{tmap.get(ta,ta)}-{tmap.get(tb,tb)}"
-                header.append(nm)
-        f.write("# " + " ".join(header) + "\n")
-
-        for i in range(len(r)):
-            row = [f"{r[i]:.6f}", f"{g_total[i]:.6f}"]
-            for ta in all_types:
-                for tb in all_types:
-                    if tb < ta:
-                        continue
-                    g = partial_rdf[(ta, tb)][i]
-                    row.append(f"{g:.6f}")
-            f.write(" ".join(row) + "\n")
+    header = ["r", "g_total"]
+    cols = [r, g_total]
+    for ta in all_types:
+        for tb in all_types:
+            if tb < ta:
+                continue
+            header.append(f"g_{tmap.get(ta,ta)}-{tmap.get(tb,tb)}")
+            cols.append(partial_rdf[(ta, tb)])
+    np.savetxt(args.txt, np.column_stack(cols), fmt="%.6f",
+               header=" ".join(header), comments="# ")
 
     print(f"[INFO] wrote txt: {args.txt}")
 
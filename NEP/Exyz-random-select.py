@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import os
 import sys
 import random
 
@@ -33,23 +34,28 @@ train_file = f"{prefix}train.xyz" if prefix else "train.xyz"
 test_file  = f"{prefix}test.xyz"  if prefix else "test.xyz"
 
 # -------------------------
-# 读取所有帧
+# 建立帧索引：每帧只记 (字节偏移, 字节数)，不把整个文件读进内存
 # -------------------------
 frames = []
-with open(input_file, "r") as f:
-    lines = f.readlines()
+with open(input_file, "rb") as f:
+    lineno = 0
+    while True:
+        offset = f.tell()
+        line = f.readline()
+        if not line:
+            break
+        lineno += 1
+        try:
+            n_atoms = int(line.strip())
+        except:
+            print(f"Error: cannot read number of atoms in line {lineno}")
+            sys.exit(1)
 
-i = 0
-while i < len(lines):
-    try:
-        n_atoms = int(lines[i].strip())
-    except:
-        print(f"Error: cannot read number of atoms in line {i+1}")
-        sys.exit(1)
-
-    frame = lines[i : i + 2 + n_atoms]
-    frames.append(frame)
-    i += 2 + n_atoms
+        for _ in range(1 + n_atoms):
+            if not f.readline():
+                break
+            lineno += 1
+        frames.append((offset, f.tell() - offset))
 
 # -------------------------
 # 随机打乱
@@ -64,15 +70,31 @@ train_frames = frames[:num_train]
 test_frames = frames[num_train:]
 
 # -------------------------
-# 输出
+# 输出：按索引直接拷贝字节，Linux 上用 os.sendfile 在内核里完成
 # -------------------------
-with open(train_file, "w") as f:
-    for frame in train_frames:
-        f.writelines(frame)
+def copy_frames(src, out_file, index):
+    # 无缓冲输出：sendfile 与回退路径的 write 都直接落到同一个 fd，帧顺序不会错乱
+    with open(out_file, "wb", buffering=0) as out:
+        for offset, nbytes in index:
+            done = 0
+            if hasattr(os, "sendfile"):
+                try:
+                    while done < nbytes:
+                        sent = os.sendfile(out.fileno(), src.fileno(), offset + done, nbytes - done)
+                        if sent == 0:
+                            break
+                        done += sent
+                except OSError:
+                    pass
+            if done < nbytes:
+                src.seek(offset + done)
+                rest = memoryview(src.read(nbytes - done))
+                while rest:
+                    rest = rest[out.write(rest):]
 
-with open(test_file, "w") as f:
-    for frame in test_frames:
-        f.writelines(frame)
+with open(input_file, "rb") as src:
+    copy_frames(src, train_file, train_frames)
+    copy_frames(src, test_file, test_frames)
 
 print(f"输入文件：{input_file}")
 print(f"总帧数：{len(frames)}")
@@ -15,7 +15,7 @@ from collections import Counter
 
 from ase.io import read, write
 import matplotlib.pyplot as plt
-from sklearn.decomposition import PCA
+from sklearn.utils.extmath import randomized_svd
 
 from pynep.calculate import NEP
 from pynep.select import FarthestPointSample
@@ -36,6 +36,27 @@ def print_progress_bar(iteration, total, prefix='', suffix='',
         print()
 
 
+def _mean_descriptors(frames, calc, prefix):
+    """
+    逐结构计算 descriptor 的原子平均，直接写进预分配的 (N, D) 数组。
+    pynep 的 get_property 一次只算一个结构；进度条约每 1% 刷新一次。
+    """
+    total = len(frames)
+    out = None
+    step = max(1, total // 100)
+    for i, at in enumerate(frames):
+        des = calc.get_property('descriptor', at)  # (Nat, D)
+        if out is None:
+            out = np.empty((total, des.shape[1]))
+        out[i] = des.mean(axis=0)
+        if (i + 1) % step == 0 or i + 1 == total:
+            print_progress_bar(i + 1, total, prefix=prefix,
+                               suffix='Complete', length=50)
+    if out is None:
+        out = np.empty((0, 0))
+    return out
+
+
 def calculate_descriptors(sampledata, traindata, calc):
     """
     对每个结构计算 NEP descriptor，并取所有原子的平均值。
@@ -44,27 +65,8 @@ def calculate_descriptors(sampledata, traindata, calc):
         des_sample : (Ns, D)
         des_train  : (Nt, D)
     """
-    total_sample = len(sampledata)
-    total_train = len(traindata)
-
-    des_sample = []
-    for i, at in enumerate(sampledata, 1):
-        des = calc.get_property('descriptor', at)  # (Nat, D)
-        des_sample.append(np.mean(des, axis=0))
-        print_progress_bar(i, total_sample,
-                           prefix=' Processing sampledata:',
-                           suffix='Complete', length=50)
-    des_sample = np.array(des_sample)
-
-    des_train = []
-    for i, at in enumerate(traindata, 1):
-        des = calc.get_property('descriptor', at)
-        des_train.append(np.mean(des, axis=0))
-        print_progress_bar(i, total_train,
-                           prefix=' Processing traindata: ',
-                           suffix='Complete', length=50)
-    des_train = np.array(des_train)
-
+    des_sample = _mean_descriptors(sampledata, calc, ' Processing sampledata:')
+    des_train = _mean_descriptors(traindata, calc, ' Processing traindata: ')
     return des_sample, des_train
 
 
@@ -148,12 +150,13 @@ def main():
     print("[INFO] Written selected structures to selected.xyz")
 
     # ======================= PCA ======================= #
-    reducer = PCA(n_components=2)
-    reducer.fit(des_sample)
+    # 只要前 2 个主成分：对中心化的 des_sample 做截断随机 SVD，fit 与投影一次完成
+    mean = des_sample.mean(axis=0)
+    U, S, Vt = randomized_svd(des_sample - mean, n_components=2, random_state=0)
 
-    proj_sample = reducer.transform(des_sample)
-    proj_train = reducer.transform(des_train)
-    proj_selected = reducer.transform(des_sample[selected_idx])
+    proj_sample = U * S
+    proj_train = (des_train - mean) @ Vt.T
+    proj_selected = proj_sample[selected_idx]
 
     # ======================= 结构类型分类 ======================= #
     train_labels = [classify_structure(at) for at in traindata]
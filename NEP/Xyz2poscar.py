@@ -15,22 +15,38 @@ Usage:
     python convert_to_poscar.py traj.xyz --order Cu In P S
 """
 
+import os
 import sys
 import re
 import numpy as np
 import argparse
 from collections import Counter
+from functools import lru_cache
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
 
 
-def parse_cell(line):
-    """Extract the 3×3 lattice vectors from a line containing Lattice="..."."""
-    match = re.search(r'Lattice="([^"]+)"', line)
+_LATTICE_RE = re.compile(r'Lattice="([^"]+)"')
+
+
+@lru_cache(maxsize=256)
+def _parse_cell_cached(line):
+    match = _LATTICE_RE.search(line)
     if not match:
         raise RuntimeError(f"Cannot find Lattice in line: {line}")
-    values = list(map(float, match.group(1).split()))
+    values = tuple(map(float, match.group(1).split()))
     if len(values) != 9:
-        raise RuntimeError(f"Expected 9 floats in Lattice, got {len(values)}: {values}")
-    return [values[0:3], values[3:6], values[6:9]]
+        raise RuntimeError(f"Expected 9 floats in Lattice, got {len(values)}: {list(values)}")
+    return (values[0:3], values[3:6], values[6:9])
+
+
+def parse_cell(line):
+    """
+    Extract the 3×3 lattice vectors from a line containing Lattice="...".
+    Returns a tuple of three 3-tuples; results are memoized per raw line,
+    so constant-cell (NVT) trajectories parse the lattice only once.
+    """
+    return _parse_cell_cached(line)
 
 
 def write_poscar_cartesian(species, coords, cell, filename, preferred_order):
@@ -49,62 +65,90 @@ def write_poscar_cartesian(species, coords, cell, filename, preferred_order):
 
     numbers = [count[e] for e in elements]
 
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(f"{filename}\n1.0\n")
-
-        # Write lattice vectors
-        for vec in cell:
-            f.write(f"  {vec[0]:.10f}  {vec[1]:.10f}  {vec[2]:.10f}\n")
-
-        # Elements and counts
-        f.write(" ".join(elements) + "\n")
-        f.write(" ".join(map(str, numbers)) + "\n")
-        f.write("Cartesian\n")
-
-        # Group coordinates by element
-        for elem in elements:
-            for sp, pos in zip(species, coords):
-                if sp == elem:
-                    f.write(f"  {pos[0]:.10f}  {pos[1]:.10f}  {pos[2]:.10f}\n")
-
-
-def convert(input_file, preferred_order):
-    """Main routine to generate POSCAR files per frame."""
-    lines = open(input_file, 'r').read().splitlines()
-    i = 0
-    frame_index = 1
-
-    while i < len(lines):
-        line = lines[i].strip()
+    # Group coordinates by element: one stable sort keeps the input order within each element
+    elem_to_idx = {e: k for k, e in enumerate(elements)}
+    keys = np.fromiter((elem_to_idx[s] for s in species), dtype=np.int32, count=len(species))
+    order = np.argsort(keys, kind="stable")
+    coords_sorted = np.asarray(coords)[order]
+
+    # Build the whole file as one string and write it once
+    parts = [f"{filename}\n1.0\n"]
+    for vec in cell:
+        parts.append(f"  {vec[0]:.10f}  {vec[1]:.10f}  {vec[2]:.10f}\n")
+    parts.append(" ".join(elements) + "\n")
+    parts.append(" ".join(map(str, numbers)) + "\n")
+    parts.append("Cartesian\n")
+    parts.extend(f"  {x:.10f}  {y:.10f}  {z:.10f}\n" for x, y, z in coords_sorted.tolist())
+
+    with open(filename, "w", encoding="utf-8", buffering=1 << 20) as f:
+        f.write("".join(parts))
+
+
+def iter_frames(f):
+    """
+    Stream frames from an open trajectory file, one at a time.
+    Yields (natoms, cell, species, coords); memory stays O(one frame).
+    """
+    for line in f:
+        line = line.strip()
 
         if not line or not line.split()[0].isdigit():
-            i += 1
             continue
 
         natoms = int(line.split()[0])
-        i += 1
-        if i >= len(lines):
+        lattice_line = next(f, None)
+        if lattice_line is None:
             break
 
         # Parse lattice
-        cell = parse_cell(lines[i])
-        i += 1
+        cell = parse_cell(lattice_line)
 
-        species = []
-        coords  = []
+        # Species column in Python, x/y/z columns parsed by NumPy in C
+        block = list(islice(f, natoms))
+        if len(block) < natoms:
+            raise RuntimeError(f"Incomplete frame: expected {natoms} atoms, got {len(block)}")
+        species = [l.split(None, 1)[0] for l in block]
+        coords  = np.loadtxt(block, usecols=(1, 2, 3), dtype=np.float64, ndmin=2)
 
-        for _ in range(natoms):
-            toks = lines[i].split()
-            species.append(toks[0])
-            coords.append(tuple(map(float, toks[1:4])))
-            i += 1
+        yield natoms, cell, species, coords
 
-        # Write POSCAR
-        out_name = f"POSCAR-{frame_index}"
-        write_poscar_cartesian(species, coords, cell, out_name, preferred_order)
 
-        print(f"→ Frame {frame_index}: wrote {out_name} with {natoms} atoms")
-        frame_index += 1
+def write_frame(task):
+    """
+    Worker entry point: task = (frame_index, natoms, cell, species, coords, preferred_order).
+    Writes POSCAR-{frame_index} and returns (frame_index, out_name, natoms).
+    """
+    frame_index, natoms, cell, species, coords, preferred_order = task
+    out_name = f"POSCAR-{frame_index}"
+    write_poscar_cartesian(species, coords, cell, out_name, preferred_order)
+    return frame_index, out_name, natoms
+
+
+def convert(input_file, preferred_order, workers=1):
+    """Main routine to generate POSCAR files per frame."""
+    with open(input_file, 'r', buffering=1 << 20) as f:
+        tasks = (
+            (frame_index, natoms, cell, species, coords, preferred_order)
+            for frame_index, (natoms, cell, species, coords) in enumerate(iter_frames(f), 1)
+        )
+
+        if workers <= 1:
+            results = map(write_frame, tasks)
+            for frame_index, out_name, natoms in results:
+                print(f"→ Frame {frame_index}: wrote {out_name} with {natoms} atoms")
+            return
+
+        # Frames are independent: format/write them in worker processes.
+        # Feed the pool in windows so only a bounded number of frames is in memory.
+        chunksize = 8
+        window = workers * chunksize * 4
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            while True:
+                batch = list(islice(tasks, window))
+                if not batch:
+                    break
+                for frame_index, out_name, natoms in ex.map(write_frame, batch, chunksize=chunksize):
+                    print(f"→ Frame {frame_index}: wrote {out_name} with {natoms} atoms")
 
 
 def main():
@@ -118,9 +162,15 @@ def main():
         default=["Cu", "P", "S", "In"],
         help="Preferred element ordering, e.g. --order Cu In P S",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Number of worker processes for writing frames (0 = all CPUs, 1 = serial)",
+    )
 
     args = parser.parse_args()
-    convert(args.input_file, args.order)
+    convert(args.input_file, args.order, args.workers or os.cpu_count() or 1)
 
 
 if __name__ == "__main__":
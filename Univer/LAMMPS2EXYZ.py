@@ -1,8 +1,22 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import io
+import os
+import mmap
 import argparse
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# pandas 可选：装了就用 read_csv 的 C 引擎解析 ATOMS 块，否则用 np.loadtxt
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+
+# 每帧 extxyz 的前两行（原子数 + 注释行），格式串只解析一次
+HEADER_FMT = '%d\nTime=%d pbc="T T T" Lattice="%s" Properties=species:S:1:pos:R:3\n'
 
 
 def parse_type_map(s):
@@ -64,6 +78,36 @@ def _choose_coord_columns(header):
     )
 
 
+def _find_timestep(mm, start):
+    """从 start 起找下一个位于行首的 "ITEM: TIMESTEP"，找不到返回 -1"""
+    pos = mm.find(b"ITEM: TIMESTEP", start)
+    while pos > 0 and mm[pos - 1:pos] != b"\n":
+        pos = mm.find(b"ITEM: TIMESTEP", pos + 1)
+    return pos
+
+
+def _parse_atom_rows(buf, usecols, nat):
+    """
+    把一帧 ATOMS 块（bytes）的前 nat 行解析成 (nat, len(usecols)) 的 float64 数组，
+    列顺序与 usecols 相同。float_precision="round_trip" 保证和 Python float() 逐位一致。
+    """
+    if pd is not None:
+        df = pd.read_csv(io.BytesIO(buf), sep=r"\s+", header=None, nrows=nat,
+                         usecols=list(usecols), dtype=np.float64, engine="c",
+                         na_filter=False, float_precision="round_trip")
+        return df[list(usecols)].to_numpy()
+    return np.loadtxt(io.BytesIO(buf), usecols=usecols, dtype=np.float64,
+                      max_rows=nat, ndmin=2)
+
+
+def _readline(mm, pos):
+    """从 mmap 的 pos 处读一行，返回 (去掉首尾空白的文本, 下一行起点)"""
+    end = mm.find(b"\n", pos)
+    if end < 0:
+        end = len(mm)
+    return mm[pos:end].decode().strip(), end + 1
+
+
 def read_lammps_dump(path):
     """
     Read LAMMPS dump with format:
@@ -81,120 +125,124 @@ def read_lammps_dump(path):
     """
     frames = []
 
-    with open(path, "r") as f:
-        lines = [l.strip() for l in f]
-
-    i = 0
-    n = len(lines)
-    while i < n:
-        # 寻找 "ITEM: TIMESTEP"
-        if not lines[i].startswith("ITEM: TIMESTEP"):
-            i += 1
-            continue
-
-        i += 1
-        if i >= n:
-            break
-        timestep = int(lines[i])
-        i += 1
-
-        # NUMBER OF ATOMS
-        if i >= n or not lines[i].startswith("ITEM: NUMBER OF ATOMS"):
-            raise RuntimeError("Missing 'ITEM: NUMBER OF ATOMS'")
-        i += 1
-        nat = int(lines[i])
-        i += 1
-
-        # BOX BOUNDS
-        if i >= n or not lines[i].startswith("ITEM: BOX BOUNDS"):
-            raise RuntimeError("Missing 'ITEM: BOX BOUNDS'")
-        box_header = lines[i]
-        i += 1
-
-        # 兼容：lo hi / lo hi tilt
-        xlo, xhi, xy = _parse_box_line(lines[i]); i += 1
-        ylo, yhi, xz = _parse_box_line(lines[i]); i += 1
-        zlo, zhi, yz = _parse_box_line(lines[i]); i += 1
-
-        # 构造晶格矩阵 (与 OVITO/VASP 一致)
-        ax = xhi - xlo
-        by = yhi - ylo
-        cz = zhi - zlo
-
-        a = np.array([ax, 0.0, 0.0], float)
-        b = np.array([xy, by, 0.0], float)
-        c = np.array([xz, yz, cz], float)
-
-        lattice = np.vstack([a, b, c])  # 3×3
-
-        # ATOMS
-        if i >= n or not lines[i].startswith("ITEM: ATOMS"):
-            raise RuntimeError("Missing 'ITEM: ATOMS' line")
-
-        header_tokens = lines[i].split()[2:]
-        i += 1
-
-        colmap = {h: idx for idx, h in enumerate(header_tokens)}
-
-        # id / type 必须有
-        for r in ["id", "type"]:
-            if r not in colmap:
-                raise RuntimeError(f"Dump 缺少列: {r!r}，当前列: {header_tokens}")
-
-        # 选择坐标列
-        cx, cy, cz_name = _choose_coord_columns(header_tokens)
-
-        # 读取原子行
-        rows = lines[i:i + nat]
-        if len(rows) < nat:
-            raise RuntimeError(
-                f"期待 {nat} 行 ATOMS 数据，但文件只剩 {len(rows)} 行"
-            )
-        i += nat
-
-        ids = []
-        types = []
-        pos = []
-
-        for r in rows:
-            p = r.split()
-            ids.append(int(p[colmap["id"]]))
-            types.append(int(p[colmap["type"]]))
-            pos.append([
-                float(p[colmap[cx]]),
-                float(p[colmap[cy]]),
-                float(p[colmap[cz_name]]),
-            ])
-
-        ids = np.array(ids)
-        types = np.array(types)
-        pos = np.array(pos)
-
-        # 按 id 排序
-        idx = np.argsort(ids)
-        frames.append(
-            (timestep, lattice, types[idx], pos[idx])
-        )
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return frames
+        # mmap 只读映射：不把整个文件切成行，帧头用 find 定位，ATOMS 块直接切片交给 C 解析器
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            n = len(mm)
+            ts_pos = _find_timestep(mm, 0)
+            while ts_pos >= 0:
+                line, i = _readline(mm, ts_pos)   # "ITEM: TIMESTEP"
+                if i >= n:
+                    break
+                line, i = _readline(mm, i)
+                timestep = int(line)
+
+                # NUMBER OF ATOMS
+                line, i = _readline(mm, i)
+                if not line.startswith("ITEM: NUMBER OF ATOMS"):
+                    raise RuntimeError("Missing 'ITEM: NUMBER OF ATOMS'")
+                line, i = _readline(mm, i)
+                nat = int(line)
+
+                # BOX BOUNDS
+                line, i = _readline(mm, i)
+                if not line.startswith("ITEM: BOX BOUNDS"):
+                    raise RuntimeError("Missing 'ITEM: BOX BOUNDS'")
+
+                # 兼容：lo hi / lo hi tilt
+                line, i = _readline(mm, i); xlo, xhi, xy = _parse_box_line(line)
+                line, i = _readline(mm, i); ylo, yhi, xz = _parse_box_line(line)
+                line, i = _readline(mm, i); zlo, zhi, yz = _parse_box_line(line)
+
+                # 构造晶格矩阵 (与 OVITO/VASP 一致)
+                ax = xhi - xlo
+                by = yhi - ylo
+                cz = zhi - zlo
+
+                a = np.array([ax, 0.0, 0.0], float)
+                b = np.array([xy, by, 0.0], float)
+                c = np.array([xz, yz, cz], float)
+
+                lattice = np.vstack([a, b, c])  # 3×3
+
+                # ATOMS
+                line, i = _readline(mm, i)
+                if not line.startswith("ITEM: ATOMS"):
+                    raise RuntimeError("Missing 'ITEM: ATOMS' line")
+
+                header_tokens = line.split()[2:]
+
+                colmap = {h: idx for idx, h in enumerate(header_tokens)}
+
+                # id / type 必须有
+                for r in ["id", "type"]:
+                    if r not in colmap:
+                        raise RuntimeError(f"Dump 缺少列: {r!r}，当前列: {header_tokens}")
+
+                # 选择坐标列
+                cx, cy, cz_name = _choose_coord_columns(header_tokens)
+
+                # 原子块 = 本帧 ATOMS 头之后到下一个 TIMESTEP（或文件尾）之间的字节
+                ts_pos = _find_timestep(mm, i)
+                block = mm[i:ts_pos if ts_pos >= 0 else n]
+
+                # 整块交给 C 解析器（pandas 或 np.loadtxt），只取 id/type/坐标 5 列
+                usecols = (colmap["id"], colmap["type"], colmap[cx], colmap[cy], colmap[cz_name])
+                data = _parse_atom_rows(block, usecols, nat) if nat > 0 else np.empty((0, 5))
+                if data.shape[0] < nat:
+                    raise RuntimeError(
+                        f"期待 {nat} 行 ATOMS 数据，但文件只剩 {data.shape[0]} 行"
+                    )
+                ids = data[:, 0].astype(np.int64)
+                types = data[:, 1].astype(np.int64)
+                pos = data[:, 2:5]
+
+                # 按 id 排序
+                idx = np.argsort(ids)
+                frames.append(
+                    (timestep, lattice, types[idx], pos[idx])
+                )
 
     return frames
 
 
-def write_extxyz(frames, type_map, outfile):
-    with open(outfile, "w") as f:
-        for (ts, lat, types, pos) in frames:
-            nat = len(types)
-            # Lattice="ax ay az bx by bz cx cy cz"
-            lat_flat = " ".join(f"{x:.8f}" for x in lat.flatten())
-
-            f.write(f"{nat}\n")
-            f.write(
-                f'Time={ts} pbc="T T T" Lattice="{lat_flat}" '
-                f'Properties=species:S:1:pos:R:3\n'
-            )
-
-            for t, (x, y, z) in zip(types, pos):
-                elem = type_map.get(t, f"T{t}")
-                f.write(f"{elem} {x:.8f} {y:.8f} {z:.8f}\n")
+def format_frame(task):
+    """
+    把一帧格式化成 extxyz 文本（可在子进程中运行）
+    task = ((timestep, lattice, types, pos), type_map)
+    """
+    (ts, lat, types, pos), type_map = task
+    nat = len(types)
+    # Lattice="ax ay az bx by bz cx cy cz"
+    lat_flat = " ".join(np.char.mod("%.8f", lat.ravel()))
+
+    # 元素名只按出现过的类型查一次表，再用 inverse 下标展开成整列
+    uniq, inv = np.unique(types, return_inverse=True)
+    elem = np.array([type_map.get(int(t), f"T{int(t)}") for t in uniq], dtype=object)
+    table = np.empty((nat, 4), dtype=object)
+    table[:, 0] = elem[inv]
+    table[:, 1:] = pos
+
+    # 整帧用一次 % 格式化生成
+    head = HEADER_FMT % (nat, ts, lat_flat)
+    body = ("%s %.8f %.8f %.8f\n" * nat) % tuple(table.ravel().tolist())
+    return head + body
+
+
+def write_extxyz(frames, type_map, outfile, workers=1):
+    tasks = [(fr, type_map) for fr in frames]
+    with open(outfile, "w", buffering=1 << 20) as f:
+        if workers <= 1 or len(tasks) <= 1:
+            for task in tasks:
+                f.write(format_frame(task))
+            return
+        # 各帧互相独立：多进程格式化，主进程按顺序写出
+        chunk = max(1, min(8, len(tasks) // (workers * 4)))
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as ex:
+            for text in ex.map(format_frame, tasks, chunksize=chunk):
+                f.write(text)
 
 
 def main():
@@ -206,6 +254,8 @@ def main():
         required=True,
         help='e.g. "1:Cu,2:Se,3:Ag"',
     )
+    ap.add_argument("--workers", type=int, default=0,
+                    help="格式化各帧的进程数（0 = CPU 核数，1 = 串行）")
 
     args = ap.parse_args()
 
@@ -213,7 +263,7 @@ def main():
     frames = read_lammps_dump(args.dump)
 
     print(f"[INFO] Read {len(frames)} frames from {args.dump}")
-    write_extxyz(frames, type_map, args.out)
+    write_extxyz(frames, type_map, args.out, args.workers or os.cpu_count() or 1)
     print(f"[OK] Written extxyz → {args.out}")
 
 
@@ -15,9 +15,16 @@ Concatenate element POTCAR files into one combined POTCAR.
 """
 
 import argparse
+import json
+import mmap
 import os
+import re
+import shutil
 import sys
-from typing import List
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import lru_cache
+from itertools import islice
+from typing import BinaryIO, Dict, List, Tuple
 
 
 def parse_args(argv: List[str]) -> argparse.Namespace:
@@ -55,35 +62,202 @@ def parse_args(argv: List[str]) -> argparse.Namespace:
     return parser.parse_args(argv)
 
 
+@lru_cache(maxsize=1024)
 def ensure_dir_exists(path: str) -> str:
+    """检查 POTCAR 库目录是否存在；结果在进程内缓存（运行期间库目录视为不变）。"""
     abs_path = os.path.abspath(path)
     if not os.path.isdir(abs_path):
         raise FileNotFoundError(f"POTCAR 库目录不存在：{abs_path}")
     return abs_path
 
 
+# 整行都是数字 token（整数 / 小数 / 科学计数法）时视为 VASP4 的原子数行，否则为 VASP5 的元素行
+_NUM = r"[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?"
+_NUMERIC_LINE = re.compile(rf"^\s*{_NUM}(?:\s+{_NUM})*\s*$")
+
+# POTCAR 库索引：{库目录: {元素名: POTCAR 路径}}，进程内缓存 + ~/.cache 下的 JSON 持久化
+_POTCAR_INDEX: Dict[str, Dict[str, str]] = {}
+
+
+def potcar_index_file() -> str:
+    cache_dir = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_dir, "potcar_index.json")
+
+
+def load_potcar_index(base_dir: str) -> Dict[str, str]:
+    """
+    返回库目录下 {元素名: POTCAR 路径} 的索引。
+    首次使用时 scandir 扫描一遍并写入 JSON；之后只要库目录的 mtime 未变就直接复用，
+    避免在 Lustre/NFS 上对每个元素反复 stat。
+    """
+    if base_dir in _POTCAR_INDEX:
+        return _POTCAR_INDEX[base_dir]
+
+    mtime = os.stat(base_dir).st_mtime_ns
+    index_file = potcar_index_file()
+    try:
+        with open(index_file, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+
+    entry = cache.get(base_dir)
+    if isinstance(entry, dict) and entry.get("mtime") == mtime:
+        index = entry["potcars"]
+    else:
+        index = {}
+        # 一次 scandir 列出所有元素子目录；is_dir 用目录项自带的类型信息，不再逐个 stat，
+        # POTCAR 文件本身是否存在留给 open_potcar 的 open 判断
+        with os.scandir(base_dir) as it:
+            for e in it:
+                if e.is_dir():
+                    index[e.name] = os.path.join(e.path, "POTCAR")
+        cache[base_dir] = {"mtime": mtime, "potcars": index}
+        # 写缓存失败（只读 HOME 等）不影响合并
+        try:
+            os.makedirs(os.path.dirname(index_file), exist_ok=True)
+            tmp = f"{index_file}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(cache, f)
+            os.replace(tmp, index_file)
+        except OSError:
+            pass
+
+    _POTCAR_INDEX[base_dir] = index
+    return index
+
+
+@lru_cache(maxsize=1024)
 def locate_potcar(base_dir: str, element: str) -> str:
-    path = os.path.join(base_dir, element, "POTCAR")
-    if not os.path.isfile(path):
-        raise FileNotFoundError(f"未找到 {element} 的 POTCAR：{path}")
+    """
+    返回元素 POTCAR 的路径；(库目录, 元素) 的结果在进程内缓存。
+    元素目录是否存在只查索引（库目录的一次 scandir）；"Fe/sv" 这类子路径不在索引里，
+    直接拼出路径，POTCAR 是否存在交给 open_potcar 的 open 判断。
+    """
+    path = load_potcar_index(base_dir).get(element)
+    if path is None:
+        path = os.path.join(base_dir, element, "POTCAR")
+        # 普通元素名不在目录列表里就是库中没有，无需再碰文件系统
+        if os.sep not in element and (os.altsep is None or os.altsep not in element):
+            raise FileNotFoundError(f"未找到 {element} 的 POTCAR：{path}")
     return path
 
 
+def copy_file(src, dst) -> None:
+    """把 src 的全部内容追加到 dst（没有 os.writev 的平台上使用）"""
+    shutil.copyfileobj(src, dst, length=1 << 20)
+
+
+def write_buffers(fd: int, buffers: List) -> None:
+    """
+    用 os.writev 把 buffers 依次写到 fd：每次最多 IOV_MAX 段，
+    遇到部分写入时从断点处继续，直到全部写完。
+    """
+    try:
+        iov_max = os.sysconf("SC_IOV_MAX")
+    except (AttributeError, ValueError, OSError):
+        iov_max = 1024
+    if iov_max <= 0:
+        iov_max = 1024
+
+    views = [memoryview(b) for b in buffers if len(b)]
+    i = 0
+    while i < len(views):
+        n = os.writev(fd, views[i:i + iov_max])
+        while n and i < len(views):
+            if n >= len(views[i]):
+                n -= len(views[i])
+                i += 1
+            else:
+                views[i] = views[i][n:]
+                n = 0
+    for v in views:
+        v.release()
+
+
+def open_potcar(base_dir: str, element: str) -> Tuple[str, BinaryIO, int, bool]:
+    """
+    定位并打开某元素的 POTCAR，返回 (路径, 文件对象, 字节数, 是否以换行结尾)。
+    同时提示内核预读整个文件，冷缓存 / 网络文件系统上可提前把数据拉进页缓存。
+    """
+    path = locate_potcar(base_dir, element)
+    # 直接 open（EAFP），不再先 isfile 多做一次 stat
+    try:
+        f = open(path, "rb")
+    except (FileNotFoundError, IsADirectoryError):
+        raise FileNotFoundError(f"未找到 {element} 的 POTCAR：{path}") from None
+    fd = f.fileno()
+    size = os.fstat(fd).st_size
+    # 只读最后一个字节判断结尾换行；pread 不移动文件偏移，后续拷贝从 0 开始
+    if not size:
+        last = b""
+    elif hasattr(os, "pread"):
+        last = os.pread(fd, 1, size - 1)
+    else:
+        f.seek(size - 1)
+        last = f.read(1)
+        f.seek(0)
+    ends_with_newline = last == b"\n"
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(fd, 0, size, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+    return path, f, size, ends_with_newline
+
+
 def merge_potcars(base_dir: str, elements: List[str], output: str) -> None:
     if not elements:
         raise ValueError("元素列表为空，无法合并 POTCAR。")
 
     output_path = os.path.abspath(output)
-    with open(output_path, "wb") as out_f:
-        for idx, elem in enumerate(elements, 1):
-            potcar_path = locate_potcar(base_dir, elem)
-            with open(potcar_path, "rb") as f:
-                data = f.read()
-            out_f.write(data)
-            # 元素之间保证换行分隔
-            if idx != len(elements) and not data.endswith(b"\n"):
-                out_f.write(b"\n")
-            print(f"[Leo] ✅ 已添加 {elem}: {potcar_path}")
+    load_potcar_index(base_dir)  # 先在主线程建好索引，线程池里只做查表
+    # 各元素的 POTCAR 由线程池并行打开 / 预读，主线程按元素顺序依次写出
+    maps: List[mmap.mmap] = []
+    with ThreadPoolExecutor(max_workers=min(8, len(elements))) as pool:
+        futures = [pool.submit(open_potcar, base_dir, elem) for elem in elements]
+        try:
+            # 输出用无缓冲的原始文件对象（FileIO）：writev 直接作用在 fd 上，
+            # 其余少量写入也不再经过 BufferedWriter 多拷贝一次
+            with open(output_path, "wb", buffering=0) as out_f:
+                # 支持 writev 时：各 POTCAR mmap 后连同分隔换行一起，用一次 scatter-gather 写出；
+                # 否则逐个文件 copy_file
+                use_writev = hasattr(os, "writev")
+                buffers = []
+                added = []
+                for idx, (elem, fut) in enumerate(zip(elements, futures), 1):
+                    potcar_path, f, size, ends_with_newline = fut.result()
+                    with f:
+                        if not use_writev:
+                            copy_file(f, out_f)
+                        elif size:
+                            maps.append(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+                            buffers.append(maps[-1])
+                    # 元素之间保证换行分隔
+                    if idx != len(elements) and not ends_with_newline:
+                        if use_writev:
+                            buffers.append(b"\n")
+                        else:
+                            out_f.write(b"\n")
+                    if use_writev:
+                        added.append((elem, potcar_path))
+                    else:
+                        print(f"[Leo] ✅ 已添加 {elem}: {potcar_path}")
+                if use_writev:
+                    write_buffers(out_f.fileno(), buffers)
+                    # 数据真正写出后再逐个报告
+                    for elem, potcar_path in added:
+                        print(f"[Leo] ✅ 已添加 {elem}: {potcar_path}")
+        finally:
+            for mm in maps:
+                mm.close()
+            # 出错时取消未开始的任务，并关闭其余已经打开的文件（重复 close 无副作用）
+            for fut in futures:
+                fut.cancel()
+            wait(futures)
+            for fut in futures:
+                if not fut.cancelled() and fut.exception() is None:
+                    fut.result()[1].close()
     print(f"[Leo] 🎉 合并完成，输出文件: {output_path}")
 
 
@@ -92,8 +266,9 @@ def parse_poscar_elements(poscar_path: str = "POSCAR") -> List[str]:
     if not os.path.isfile(poscar_abs):
         raise FileNotFoundError(f"POSCAR 文件不存在：{poscar_abs}")
 
+    # 只读前 6 行，不把整个 POSCAR 载入内存
     with open(poscar_abs, "r", encoding="utf-8") as f:
-        lines = [line.rstrip("\n") for line in f]
+        lines = list(islice(f, 6))
 
     if len(lines) < 6:
         raise ValueError("POSCAR 格式不完整，至少需要 6 行（包含元素行）。")
@@ -104,14 +279,7 @@ def parse_poscar_elements(poscar_path: str = "POSCAR") -> List[str]:
         raise ValueError("POSCAR 第 6 行为空，无法识别元素顺序。")
 
     # 判断第 6 行是不是纯数字（即 VASP4 格式的原子数行）
-    def _is_number(s: str) -> bool:
-        try:
-            float(s)
-            return True
-        except ValueError:
-            return False
-
-    if all(_is_number(tok) for tok in tokens):
+    if _NUMERIC_LINE.match(element_line):
         raise ValueError(
             "检测到 POSCAR 第 6 行是原子数（VASP4 格式），\n"
             "当前脚本需要 VASP5 格式（第 6 行为元素符号行）。"
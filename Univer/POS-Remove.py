@@ -1,10 +1,20 @@
-import random
 import sys
+import mmap
+import numpy as np
 
-def read_poscar(file_path):
-    """读取 POSCAR 文件并解析其内容"""
-    with open(file_path, 'r') as f:
-        lines = f.readlines()
+def index_lines(buf):
+    """返回每行在 buf 中的 [start, end) 字节范围（end 含换行符）"""
+    arr = np.frombuffer(buf, dtype=np.uint8)
+    ends = np.flatnonzero(arr == ord('\n')) + 1
+    if len(ends) == 0 or ends[-1] != len(arr):
+        ends = np.append(ends, len(arr))  # 最后一行没有换行符
+    starts = np.concatenate(([0], ends[:-1]))
+    return starts, ends
+
+def read_poscar(mm):
+    """解析 mmap 中的 POSCAR：头部解码成字符串，原子坐标行只记录字节范围"""
+    starts, ends = index_lines(mm)
+    lines = [mm[starts[k]:ends[k]].decode() for k in range(min(8, len(starts)))]
     
     title = lines[0].strip()
     scale = lines[1].strip()
@@ -12,53 +22,65 @@ def read_poscar(file_path):
     atom_types = lines[5].split()
     atom_counts = list(map(int, lines[6].split()))
     coord_type = lines[7].strip()
-    atomic_positions = lines[8:]
+    atomic_positions = (starts[8:], ends[8:])
     
     return title, scale, lattice_vectors, atom_types, atom_counts, coord_type, atomic_positions
 
-def write_poscar(file_path, title, scale, lattice_vectors, atom_types, atom_counts, coord_type, atomic_positions):
-    """将修改后的 POSCAR 文件写入新文件"""
-    with open(file_path, 'w') as f:
-        f.write(title + '\n')
-        f.write(scale + '\n')
-        f.writelines(lattice_vectors)
-        f.write(' '.join(atom_types) + '\n')
-        f.write(' '.join(map(str, atom_counts)) + '\n')
-        f.write(coord_type + '\n')
-        f.writelines(atomic_positions)
+def format_header(title, scale, lattice_vectors, atom_types, atom_counts, coord_type):
+    """生成 POSCAR 头部（前 8 行）"""
+    return (
+        title + '\n'
+        + scale + '\n'
+        + ''.join(lattice_vectors)
+        + ' '.join(atom_types) + '\n'
+        + ' '.join(map(str, atom_counts)) + '\n'
+        + coord_type + '\n'
+    ).encode()
 
 def remove_random_atoms(atom_type, num_remove, poscar_path):
     """从 POSCAR 文件中随机删除指定类型的原子，并保存新的 POSCAR"""
-    # 读取 POSCAR
-    title, scale, lattice_vectors, atom_types, atom_counts, coord_type, atomic_positions = read_poscar(poscar_path)
-    
-    if atom_type not in atom_types:
-        raise ValueError(f"Atom type {atom_type} not found in POSCAR.")
-    
-    index = atom_types.index(atom_type)
-    
-    # 计算原子索引范围
-    start_index = sum(atom_counts[:index])
-    end_index = start_index + atom_counts[index]
-    
-    if num_remove > atom_counts[index]:
-        raise ValueError(f"Cannot remove {num_remove} atoms, only {atom_counts[index]} available.")
-    
-    # 随机选择要删除的原子索引
-    remove_indices = set(random.sample(range(start_index, end_index), num_remove))
-    
-    # 过滤掉被删除的原子
-    new_atomic_positions = [line for i, line in enumerate(atomic_positions) if i not in remove_indices]
-    
-    # 更新原子计数
-    new_atom_counts = atom_counts[:]
-    new_atom_counts[index] -= num_remove
-    
-    # 生成输出文件名
-    output_path = f"POSCAR_del-{atom_type}-{num_remove}"
-    
-    # 写入新的 POSCAR
-    write_poscar(output_path, title, scale, lattice_vectors, atom_types, new_atom_counts, coord_type, new_atomic_positions)
+    with open(poscar_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        # 读取 POSCAR
+        title, scale, lattice_vectors, atom_types, atom_counts, coord_type, (starts, ends) = read_poscar(mm)
+        
+        if atom_type not in atom_types:
+            raise ValueError(f"Atom type {atom_type} not found in POSCAR.")
+        
+        index = atom_types.index(atom_type)
+        
+        # 计算原子索引范围
+        start_index = sum(atom_counts[:index])
+        end_index = start_index + atom_counts[index]
+        
+        if num_remove > atom_counts[index]:
+            raise ValueError(f"Cannot remove {num_remove} atoms, only {atom_counts[index]} available.")
+        
+        # 随机选择要删除的原子索引（相对该元素的起始行）
+        remove_indices = np.random.choice(atom_counts[index], num_remove, replace=False)
+        
+        # 只在该元素的行范围内做布尔掩码，其余行按整段字节原样拷贝
+        keep = np.ones(atom_counts[index], dtype=bool)
+        keep[remove_indices] = False
+        seg_starts = starts[start_index:end_index][keep].tolist()
+        seg_ends = ends[start_index:end_index][keep].tolist()
+        
+        # 更新原子计数
+        new_atom_counts = atom_counts[:]
+        new_atom_counts[index] -= num_remove
+        
+        # 生成输出文件名
+        output_path = f"POSCAR_del-{atom_type}-{num_remove}"
+        
+        # 拼成一个缓冲区，一次写入新的 POSCAR
+        body_start = starts[0] if len(starts) else len(mm)
+        type_start = starts[start_index] if start_index < len(starts) else len(mm)
+        type_end = starts[end_index] if end_index < len(starts) else len(mm)
+        parts = [format_header(title, scale, lattice_vectors, atom_types, new_atom_counts, coord_type),
+                 mm[body_start:type_start]]
+        parts.extend(mm[s:e] for s, e in zip(seg_starts, seg_ends))
+        parts.append(mm[type_end:])
+        with open(output_path, 'wb') as out:
+            out.write(b''.join(parts))
     print(f"New POSCAR saved to {output_path}")
 
 if __name__ == "__main__":
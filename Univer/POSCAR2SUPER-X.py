@@ -20,30 +20,34 @@ supercell_export.py
   python supercell_export.py POSCAR -r 3 3 1 -f lammps-data --specorder Al N
 
 注意：
-  * LAMMPS 写出时传入 masses=True 强制输出 Masses。
+  * LAMMPS data 由脚本直接写出（atom_style atomic），始终包含 Masses 段。
+  * 多种输出格式由线程池同时写出；xyz 及带额外逐原子数组的 extxyz 仍由 ASE 写出。
   * specorder 会自动补全所有元素：先按传入的顺序，再补结构中剩余元素。
 """
 
+from ase import Atoms
 from ase.io import read, write
 from ase.data import atomic_masses, atomic_numbers
 from pathlib import Path
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import argparse
+import numpy as np
 import sys
 import textwrap
 
 
+# 超胞原子数达到该值时改用 NumPy 平铺构造（见 make_supercell）
+TILE_MIN_ATOMS = 10000
+
+
 # ===========================
 # 工具函数
 # ===========================
 def unique_in_appearance(symbols):
     """按首次出现顺序返回去重后的元素序列"""
-    seen, out = set(), []
-    for s in symbols:
-        if s not in seen:
-            seen.add(s)
-            out.append(s)
-    return out
+    return list(dict.fromkeys(symbols))
 
 
 def build_specorder(symbols, hint):
@@ -52,17 +56,127 @@ def build_specorder(symbols, hint):
             再把剩余元素按结构首次出现顺序补到后面
     """
     uniq = unique_in_appearance(symbols)
-    head = [s for s in hint if s in uniq]
-    tail = [s for s in uniq if s not in head]
+    uniq_set = set(uniq)
+    head = [s for s in hint if s in uniq_set]
+    head_set = set(head)
+    tail = [s for s in uniq if s not in head_set]
     return head + tail
 
 
+def make_supercell(prim, repeat):
+    """
+    整数超胞：大体系直接用 NumPy 广播平铺坐标与各原子数组，一次构造 Atoms；
+    原子顺序与 prim.repeat 相同（晶胞平移在外层，原胞原子在内层）。
+    小体系或带约束（如 selective dynamics）时仍交给 ASE 的 repeat。
+    """
+    ncell = int(np.prod(repeat))
+    if ncell * len(prim) < TILE_MIN_ATOMS or prim.constraints:
+        return prim.repeat(repeat)
+
+    prim_cell = np.asarray(prim.get_cell())
+    shifts = np.indices(repeat).reshape(3, -1).T.astype(np.float64) @ prim_cell
+    new_pos = (prim.positions[None, :, :] + shifts[:, None, :]).reshape(-1, 3)
+
+    supercell = Atoms(cell=prim_cell * np.array(repeat)[:, None], pbc=prim.pbc,
+                      info=prim.info.copy())
+    for name, a in prim.arrays.items():
+        supercell.arrays[name] = np.tile(a, (ncell,) + (1,) * (a.ndim - 1))
+    supercell.arrays["positions"] = new_pos
+    return supercell
+
+
+def write_extxyz_fast(filename, symbols, positions, cell, pbc):
+    """用预先取好的 symbols / positions / cell 直接写 extxyz（只含 species 与 pos 两列，Lattice 保留全精度）"""
+    nat = len(symbols)
+    lat = " ".join(repr(float(x)) for x in np.asarray(cell).ravel())
+    pbc_str = " ".join("T" if p else "F" for p in pbc)
+    head = (
+        f"{nat}\n"
+        f'Lattice="{lat}" Properties=species:S:1:pos:R:3 pbc="{pbc_str}"\n'
+    )
+    rows = [(s, x, y, z) for s, (x, y, z) in zip(symbols, positions.tolist())]
+    body = ("%-2s %16.8f %16.8f %16.8f\n" * nat) % tuple(v for r in rows for v in r)
+    with open(filename, "w", buffering=1 << 20) as f:
+        f.write(head + body)
+
+
+def write_lammps_data_fast(filename, symbols, positions, cell, specorder):
+    """
+    直接写 LAMMPS data 文件（atom_style atomic，含 Masses 段），不经过 ASE 的逐原子格式化。
+    晶胞先转成 LAMMPS 约定的下三角形式（a 沿 x，b 在 xy 平面内），
+    原子坐标按分数坐标不变映射到新晶胞。
+    """
+    A, B, C = np.asarray(cell, dtype=np.float64)
+    lx = np.linalg.norm(A)
+    a_hat = A / lx
+    xy = B @ a_hat
+    ly = np.sqrt(B @ B - xy * xy)
+    xz = C @ a_hat
+    yz = (B @ C - xy * xz) / ly
+    lz = np.sqrt(C @ C - xz * xz - yz * yz)
+    lmp_cell = np.array([[lx, 0.0, 0.0], [xy, ly, 0.0], [xz, yz, lz]])
+    lmp_pos = np.linalg.solve(np.asarray(cell, dtype=np.float64).T, positions.T).T @ lmp_cell
+
+    # 元素 → LAMMPS 原子类型（按 specorder 从 1 开始）
+    type_of = {s: i + 1 for i, s in enumerate(specorder)}
+    types = np.fromiter((type_of[s] for s in symbols), dtype=np.int64, count=len(symbols))
+
+    lines = [
+        f"{filename} (written by POSCAR2SUPER-X)\n\n",
+        f"{len(symbols)} atoms\n",
+        f"{len(specorder)} atom types\n\n",
+        f"0.0 {lx:.10f} xlo xhi\n",
+        f"0.0 {ly:.10f} ylo yhi\n",
+        f"0.0 {lz:.10f} zlo zhi\n",
+    ]
+    if not np.allclose((xy, xz, yz), 0.0):
+        lines.append(f"{xy:.10f} {xz:.10f} {yz:.10f} xy xz yz\n")
+    lines.append("\nMasses\n\n")
+    lines.extend(f"{type_of[s]} {symbol_mass(s):.6f} # {s}\n" for s in specorder)
+    lines.append("\nAtoms # atomic\n\n")
+
+    atoms_block = np.column_stack([np.arange(1, len(symbols) + 1), types, lmp_pos])
+    with open(filename, "w", buffering=1 << 20) as f:
+        f.write("".join(lines))
+        np.savetxt(f, atoms_block, fmt="%d %d %.10f %.10f %.10f")
+
+
+@lru_cache(maxsize=128)
 def symbol_mass(sym):
-    """返回元素的标准原子质量（amu）"""
+    """返回元素的标准原子质量（amu），按元素符号缓存"""
     Z = atomic_numbers[sym]
     return float(atomic_masses[Z])
 
 
+def output_target(fmt, prefix):
+    """统一几个常见格式别名，返回 (ASE 格式名, 输出文件名)"""
+    fmt = fmt.lower()
+    if fmt in ("vasp", "poscar"):
+        return "vasp", f"{prefix}.POSCAR"
+    if fmt in ("lammps", "lammps-data", "data"):
+        return "lammps-data", "input.pos"
+    if fmt == "extxyz":
+        return fmt, "model.xyz"
+    return fmt, f"{prefix}.{fmt}"
+
+
+def write_one(fmt, out_filename, supercell, symbols, positions, cell, pbc, specorder):
+    """写出一种格式，返回要打印的状态行（异常在这里捕获，不影响其他格式）"""
+    try:
+        if fmt == "lammps-data":
+            write_lammps_data_fast(out_filename, symbols, positions, cell, specorder)
+        elif (fmt == "extxyz" and set(supercell.arrays) <= {"numbers", "positions"}
+              and not supercell.info and supercell.calc is None):
+            # 只有元素与坐标时才走快速写出；带其他逐原子数组（move_mask 等）、
+            # info（config_type 等）或计算器结果时交给 ASE，保证不丢信息
+            write_extxyz_fast(out_filename, symbols, positions, cell, pbc)
+        else:
+            write(out_filename, supercell, format=fmt)
+        return f"  [OK] {out_filename}  (format={fmt})"
+    except Exception as e:
+        return f"  [失败] 写出 {fmt} → {out_filename} 失败：{e}"
+
+
 # ===========================
 # 主逻辑
 # ===========================
@@ -126,7 +240,7 @@ def main():
         sys.exit(f"[错误] 无法读取 {input_path}: {e}")
 
     repeat = tuple(args.repeat)
-    supercell = prim.repeat(repeat)
+    supercell = make_supercell(prim, repeat)
 
     print("=== 超胞信息 ===")
     print(f"输入文件: {input_path}")
@@ -163,36 +277,24 @@ def main():
     # 写出多种格式
     # ===========================
     print("\n=== 写出文件 ===")
+    # 各格式共用的数组只从 Atoms 里取一次
+    positions = supercell.get_positions()
+    cell = supercell.get_cell()
+    pbc = supercell.get_pbc()
+
+    # 各格式互不依赖：用线程池同时写出，结果按输入顺序打印；同名输出文件只写一次
+    jobs = {}
     for fmt in args.formats:
-        fmt = fmt.lower()
-
-        # 统一几个常见别名
-        if fmt in ("vasp", "poscar"):
-            fmt = "vasp"
-            out_filename = f"{args.prefix}.POSCAR"
-        elif fmt in ("lammps", "lammps-data", "data"):
-            fmt = "lammps-data"
-            out_filename = f"input.pos"
-        elif fmt == "extxyz":
-            out_filename = "model.xyz"    
-        else:
-            out_filename = f"{args.prefix}.{fmt}"
+        fmt, out_filename = output_target(fmt, args.prefix)
+        jobs.setdefault(out_filename, fmt)
 
-        try:
-            if fmt == "lammps-data":
-                write(
-                    out_filename,
-                    supercell,
-                    format=fmt,
-                    specorder=specorder,
-                    masses=True,
-                )
-            else:
-                write(out_filename, supercell, format=fmt)
-
-            print(f"  [OK] {out_filename}  (format={fmt})")
-        except Exception as e:
-            print(f"  [失败] 写出 {fmt} → {out_filename} 失败：{e}")
+    def _write(item):
+        out_filename, fmt = item
+        return write_one(fmt, out_filename, supercell, symbols_all, positions, cell, pbc, specorder)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(jobs))) as ex:
+        for msg in ex.map(_write, jobs.items()):
+            print(msg)
 
     print("\n全部完成。若 LAMMPS data 中 Masses 与期望不一致，")
     print("请检查 --specorder 是否覆盖并匹配结构中的所有元素。")
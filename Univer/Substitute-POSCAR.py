@@ -16,10 +16,12 @@ python Substitute-POSCAR.py POSCAR_origin POSCAR Al Sc 0.2
 """
 
 import argparse
-import random
 import sys
+from collections import Counter
 from typing import List, Tuple
 
+import numpy as np
+
 
 def parse_arguments():
     parser = argparse.ArgumentParser(
@@ -52,12 +54,31 @@ def parse_arguments():
     return parser.parse_args()
 
 
-def read_poscar(filename: str) -> List[str]:
-    with open(filename, "r") as f:
-        lines = [line.rstrip("\n") for line in f]
-    if len(lines) < 8:
+def read_poscar(filename: str) -> Tuple[List[str], bytes]:
+    """
+    Read a POSCAR in two phases: the header (through the Direct/Cartesian line)
+    as text lines, and everything after it as one opaque bytes block.
+    """
+    with open(filename, "rb") as f:
+        header = [f.readline() for _ in range(8)]
+        if header[-1].strip().lower().startswith(b"s"):
+            header.append(f.readline())  # Selective dynamics: one more header line
+        tail = f.read()
+    header = [line.decode().rstrip("\r\n") for line in header if line]
+    if len(header) < 8:
         raise ValueError("POSCAR seems too short; not a valid VASP5 POSCAR.")
-    return lines
+    # Normalize line endings like text mode did, and terminate the last line
+    tail = tail.replace(b"\r\n", b"\n")
+    if tail and not tail.endswith(b"\n"):
+        tail += b"\n"
+    return header, tail
+
+
+def index_lines(buf: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """Return [start, end) byte offsets of every line in buf (end includes the newline)."""
+    ends = np.flatnonzero(np.frombuffer(buf, dtype=np.uint8) == ord("\n")) + 1
+    starts = np.concatenate(([0], ends))[:-1].astype(np.int64)
+    return starts, ends
 
 
 def detect_poscar_layout(lines: List[str]) -> Tuple[List[str], List[int], int, bool]:
@@ -118,34 +139,30 @@ def detect_poscar_layout(lines: List[str]) -> Tuple[List[str], List[int], int, b
     return species, counts, coord_start, selective
 
 
-def build_atom_species_list(species: List[str], counts: List[int]) -> List[str]:
+def build_atom_species_list(species: List[str], counts: List[int]) -> np.ndarray:
     """
-    Build a per-atom species list based on species and counts.
+    Build a per-atom species array based on species and counts.
     Example: species = ['Al', 'N'], counts = [2, 3]
-             -> ['Al', 'Al', 'N', 'N', 'N']
+             -> array(['Al', 'Al', 'N', 'N', 'N'])
     """
-    atom_species = []
-    for elem, n in zip(species, counts):
-        atom_species.extend([elem] * n)
-    return atom_species
+    return np.repeat(np.array(species, dtype=str), np.array(counts, dtype=np.int64))
 
 
 def substitute_atoms(
-    atom_species: List[str],
+    atom_species: np.ndarray,
     src_element: str,
     dst_element: str,
     amount: float,
     mode: str,
-    rng: random.Random,
-) -> List[str]:
+    rng: np.random.Generator,
+) -> np.ndarray:
     """
-    Perform the actual substitution on the per-atom species list.
-    Returns the updated per-atom species list.
+    Perform the actual substitution on the per-atom species array.
+    Returns the updated per-atom species array.
     """
-    n_atoms = len(atom_species)
-    src_indices = [i for i, elem in enumerate(atom_species) if elem == src_element]
+    src_indices = np.flatnonzero(atom_species == src_element)
 
-    if not src_indices:
+    if len(src_indices) == 0:
         raise ValueError(f"No atoms of source element '{src_element}' found in POSCAR.")
 
     n_src = len(src_indices)
@@ -173,16 +190,17 @@ def substitute_atoms(
         # Nothing to do
         return atom_species
 
-    chosen = rng.sample(src_indices, n_replace)
+    # Sample without replacement in C; order of the picks does not matter here
+    chosen = rng.choice(src_indices, size=n_replace, replace=False, shuffle=False)
 
-    new_atom_species = atom_species[:]
-    for idx in chosen:
-        new_atom_species[idx] = dst_element
+    # Widen the string dtype if dst_element is longer than the existing symbols
+    new_atom_species = atom_species.astype(np.result_type(atom_species.dtype, np.array(dst_element).dtype))
+    new_atom_species[chosen] = dst_element
 
     return new_atom_species
 
 
-def rebuild_species_counts(atom_species: List[str], original_order: List[str], dst_element: str) -> Tuple[List[str], List[int]]:
+def rebuild_species_counts(atom_species: np.ndarray, original_order: List[str], dst_element: str) -> Tuple[List[str], List[int]]:
     """
     From a per-atom species list, rebuild species list and counts.
 
@@ -191,11 +209,10 @@ def rebuild_species_counts(atom_species: List[str], original_order: List[str], d
     - For each species, count how many atoms remain.
     - Drop species with zero atoms.
     """
-    unique_elements_in_atoms = sorted(set(atom_species), key=lambda x: original_order.index(x) if x in original_order else len(original_order))
+    # One linear pass; all later counts and membership tests are O(1) lookups
+    counts_map = Counter(atom_species.tolist())
 
-    # Ensure dst_element appears (if present in atom_species)
-    if dst_element in atom_species and dst_element not in unique_elements_in_atoms:
-        unique_elements_in_atoms.append(dst_element)
+    order_idx = {e: i for i, e in enumerate(original_order)}
 
     # Final species list preserves as much original ordering as possible
     final_species = []
@@ -203,65 +220,60 @@ def rebuild_species_counts(atom_species: List[str], original_order: List[str], d
 
     # Start with all elements from original_order that still exist
     for elem in original_order:
-        if elem in atom_species:
+        if elem in counts_map:
             final_species.append(elem)
-            final_counts.append(atom_species.count(elem))
+            final_counts.append(counts_map[elem])
 
     # Then add any new elements that were not in original_order but appear now
-    for elem in set(atom_species):
-        if elem not in original_order:
+    for elem in counts_map:
+        if elem not in order_idx:
             final_species.append(elem)
-            final_counts.append(atom_species.count(elem))
+            final_counts.append(counts_map[elem])
 
     return final_species, final_counts
 
 
 def reorder_coordinates(
-    lines: List[str],
-    coord_start: int,
-    atom_species_old: List[str],
-    atom_species_new: List[str],
+    tail: bytes,
+    atom_species_old: np.ndarray,
+    atom_species_new: np.ndarray,
     final_species: List[str],
-) -> List[str]:
+) -> bytes:
     """
-    Rebuild coordinate lines so that atoms are grouped according to final_species
+    Rebuild the coordinate block so that atoms are grouped according to final_species
     order, while preserving each atom's coordinates and (if present) SD flags.
+    Coordinate lines are moved as raw byte slices; anything after them is kept as is.
     """
     n_atoms = len(atom_species_old)
-    coord_lines = lines[coord_start : coord_start + n_atoms]
+    starts, ends = index_lines(tail)
 
-    if len(coord_lines) != n_atoms:
+    if len(ends) < n_atoms:
         raise ValueError("Number of coordinate lines does not match total atom count.")
 
-    # 为每个原子建立 (element, coord_line)
-    atoms = list(zip(atom_species_new, coord_lines))
+    # 每个原子在 final_species 中的序号（-1 表示不在其中）
+    keys = np.full(n_atoms, -1, dtype=np.int32)
+    for rank, elem in enumerate(final_species):
+        keys[atom_species_new == elem] = rank
 
-    # 按最终元素顺序重排
-    new_coord_lines: List[str] = []
-    for elem in final_species:
-        for e, coord in atoms:
-            if e == elem:
-                new_coord_lines.append(coord)
-
-    if len(new_coord_lines) != n_atoms:
+    if (keys < 0).any():
         raise RuntimeError("Reordered coordinates length mismatch.")
 
-    # 将新的坐标行写回
-    new_lines = lines[:]
-    new_lines[coord_start : coord_start + n_atoms] = new_coord_lines
-    return new_lines
+    # 按最终元素顺序重排：稳定排序保持同种元素内的原有顺序
+    order = np.argsort(keys, kind="stable")
+    parts = [tail[s:e] for s, e in zip(starts[order].tolist(), ends[order].tolist())]
+
+    # 坐标之后的内容（速度等）原样保留
+    parts.append(tail[ends[n_atoms - 1]:] if n_atoms else tail)
+    return b"".join(parts)
 
 
 def main():
     args = parse_arguments()
 
-    if args.seed is not None:
-        rng = random.Random(args.seed)
-    else:
-        rng = random.Random()
+    rng = np.random.default_rng(args.seed)
 
-    lines = read_poscar(args.poscar_in)
-    species, counts, coord_start, selective = detect_poscar_layout(lines)
+    header, tail = read_poscar(args.poscar_in)
+    species, counts, coord_start, selective = detect_poscar_layout(header)
 
     total_atoms = sum(counts)
     atom_species_old = build_atom_species_list(species, counts)
@@ -288,19 +300,16 @@ def main():
     species_line_idx = 5
     counts_line_idx = 6
 
-    new_lines = lines[:]
-    new_lines[species_line_idx] = " ".join(final_species)
-    new_lines[counts_line_idx] = " ".join(str(n) for n in final_counts)
+    new_header = header[:coord_start]
+    new_header[species_line_idx] = " ".join(final_species)
+    new_header[counts_line_idx] = " ".join(str(n) for n in final_counts)
 
     # 按 final_species 重排坐标
-    new_lines = reorder_coordinates(
-        new_lines, coord_start, atom_species_old, atom_species_new, final_species
-    )
+    body = reorder_coordinates(tail, atom_species_old, atom_species_new, final_species)
 
     # 写出结果
-    with open(args.poscar_out, "w") as f:
-        for line in new_lines:
-            f.write(line + "\n")
+    with open(args.poscar_out, "wb", buffering=1 << 20) as f:
+        f.write(("\n".join(new_header) + "\n").encode() + body)
 
     print(f"Done. Wrote substituted POSCAR to '{args.poscar_out}'.")
     print("Summary:")